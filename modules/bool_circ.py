@@ -2,25 +2,38 @@
 Boolean circuits, defined as a subclass of open_digraphs
 '''
 
-import random
-
+from modules.hierarchical_circuit import hierarchical_circuit
 from modules.open_digraph import open_digraph
+from modules.open_digraph_mixins.open_digraph_factory_mx import random_generator
+from modules.bool_circ_mixins.bool_circ_adders_mx import bool_circ_adders_mx
+from modules.bool_circ_mixins.bool_circ_rewrite_mx import bool_circ_rewrite_mx
+from modules.bool_circ_mixins.bool_circ_simulation_mx import bool_circ_simulation_mx
+from modules.bool_circ_mixins.bool_circ_strash_mx import bool_circ_strash_mx
 
-class bool_circ(open_digraph):
+class bool_circ(open_digraph, bool_circ_adders_mx, bool_circ_rewrite_mx, bool_circ_simulation_mx, bool_circ_strash_mx):
     valid_signs = ['&', '|', ' ', '~', '^', '', '0', '1']
 
     def __init__(self, g=None):
         if g == None:
             g = open_digraph.empty()
-        else:
-            g = g.copy()
-        self._nodes = g.get_node_map()
-        self._inputs = g.get_input_ids()
-        self._outputs = g.get_output_ids()
+        # The nodes of g are shared copy on write, except those already handed out, see open_digraph.copy
+        open_digraph.__init__(self, list(g.get_input_ids()), list(g.get_output_ids()),
+                              [g._shared_node(node_id) for node_id in g._nodes])
+        self._handed_out = set()
+        self._share(node_id for node_id in g._nodes if g._is_handed_out(node_id))
+        g._share()
+        self._unique_table = {} # (label, sorted operands) -> node id, see strash
         #if not(self.is_well_formed()):
         #   raise ValueError("The given graph is not a valid boolean circuit")
     
     
+    @classmethod
+    def _from_nodes(cls, inputs, outputs, nodes):
+        circ = super()._from_nodes(inputs, outputs, nodes)
+        circ._unique_table = {}
+        return circ
+
+
     def is_well_formed(self):
         '''
     Checks if the boolean circuit is well-formed.
@@ -28,7 +41,9 @@ class bool_circ(open_digraph):
     Verifies whether the boolean circuit meets the criteria for being well-formed:
     - No cycles exist in the circuit.
     - Each node has a valid label representing a boolean operation, input, output, or space.
-    - Each node has the correct number of parents and children according to its label.
+    - Each inner node has the correct number of parents and children according to its label:
+      copies have one parent, negations and identities one parent and one child,
+      gates ('&', '|', '^') one child and constants no parent and one child.
 
     Returns:
         bool: True if the circuit is well-formed, False otherwise.
@@ -39,12 +54,21 @@ class bool_circ(open_digraph):
         if self.is_cyclic():
             return False
         
-        for node in self.get_nodes():
-            if node.get_label() == ' ' or node.get_label() != '~':
-                if node.indegree() != 1:
-                    return False
-                
-            if node.get_label() not in bool_circ.valid_signs and node.get_label() not in ['0', '1', '^']:
+        for node in self._nodes.values():
+            label = node.get_label()
+            if label not in bool_circ.valid_signs:
+                return False
+
+            if self.is_input(node.get_id()) or self.is_output(node.get_id()):
+                continue
+
+            if label in (' ', '~', '') and node.indegree() != 1:
+                return False
+
+            if label in ('~', '', '&', '|', '^', '0', '1') and node.outdegree() != 1:
+                return False
+
+            if label in ('0', '1') and node.indegree() != 0:
                 return False
         
         return True
@@ -114,47 +138,101 @@ class bool_circ(open_digraph):
     
 
     @classmethod
-    def random_bool_circ(cls, n, bound):
+    def random_bool_circ(cls, n, bound, inputs=None, seed=None):
         '''
     Generates a random boolean circuit.
 
-    Constructs a random boolean circuit with the specified number of nodes and a given bound for multiplicity.
+    Constructs, in O(V+E), a random boolean circuit with n gates of fan-in at most bound. Each gate draws its
+    operands among the inputs and the preceding gates; gates with one operand are negations, the others random
+    AND, OR and XOR gates. Signals used several times go through a copy node and unused gates feed an output.
 
     Parameters:
-        n (int): The number of nodes in the circuit.
-        bound (int): The upper bound for the multiplicity of edges.
+        n (int): The number of gates in the circuit.
+        bound (int): The maximum number of operands of a gate.
+        inputs (int, optional): The number of inputs (at most n), all of them being used. Defaults to bound.
+        seed (int, random.Random or numpy Generator, optional): The source of randomness, see random_generator.
 
     Returns:
         bool_circ: A randomly generated boolean circuit.
     '''
-        binary_operators = ["&", "|", "^"]
-        random_DAG = open_digraph.random(n, bound, 0, 0, form="DAG")
-        nodes = [node for node in random_DAG.get_nodes()]
-
-        for node in nodes:
-            if node.get_parents() == {}:
-                new_in = random_DAG.add_node("", children={node.get_id():1})
-                random_DAG.set_inputs(random_DAG.get_input_ids() + [new_in])
-            if node.get_children() == {}:
-                new_out = random_DAG.add_node("", parents={node.get_id():1})
-                random_DAG.set_outputs(random_DAG.get_output_ids() + [new_out])
-        
-        for node in nodes:
-            if node.indegree() == 1 and node.outdegree() == 1:
-                node.set_label("~")
-            elif node.indegree() == 1 and node.outdegree() > 1:
-                node.set_label(" ")
-            elif node.outdegree() > 1 and node.indegree() == 1:
-                node.set_label(random.choice(binary_operators))
-            elif node.outdegree() > 1 and node.indegree() > 1:
-                new = random_DAG.add_node(" ", children={nd: ch for nd, ch in node.get_children().items()})
-                node.set_children({})
-                node.set_label(random.choice(binary_operators))
-                random_DAG.add_edge(node.get_id(), new)
-            else:
-                node.set_label(random.choice(binary_operators))
-
-        return bool_circ(random_DAG)
+        if n > 0 and bound < 1:
+            raise ValueError("Gates must have at least one operand")
+        rng = random_generator(seed)
+        n_inputs = min(bound if inputs is None else inputs, n)
+        signals = n_inputs + n
+
+        operands = []
+        outdegree = [0] * signals
+        for j in range(n):
+            parents = rng.sample(range(n_inputs + j), min(rng.randint(1, bound), n_inputs + j))
+            if j < n_inputs and j not in parents:
+                parents[0] = j
+            for parent in parents:
+                outdegree[parent] += 1
+            operands.append(parents)
+
+        gates = [('~' if len(parents) == 1 else rng.choice(['&', '|', '^']), parents) for parents in operands]
+        return cls.from_gates(n_inputs, gates, [signal for signal in range(n_inputs, signals) if outdegree[signal] == 0])
+
+
+    @classmethod
+    def from_gates(cls, n_inputs, gates, outputs):
+        '''
+    Builds a boolean circuit from a gate list, in bulk and in O(V+E).
+
+    Signals 0 to n_inputs - 1 are the inputs and gate k drives signal n_inputs + k. Gates which do not reach
+    an output are dropped and signals read several times go through a copy node.
+
+    Parameters:
+        n_inputs (int): The number of inputs.
+        gates ((str, int list) list): The label and the operand signals of each gate, operands being inputs
+            or preceding gates.
+        outputs (int list): The signals of the outputs, in port order.
+
+    Returns:
+        bool_circ: The circuit, whose node ids are the inputs, then the gates, the copies and the outputs.
+    '''
+        signals = n_inputs + len(gates)
+        live = [False] * signals
+        for signal in outputs:
+            live[signal] = True
+        for k in reversed(range(len(gates))):
+            if live[n_inputs + k]:
+                for operand in gates[k][1]:
+                    if not 0 <= operand < n_inputs + k:
+                        raise ValueError(f"Gate {k} reads signal {operand}, which is not an input or a preceding gate")
+                    live[operand] = True
+
+        labels = [''] * n_inputs
+        node_of = list(range(n_inputs)) + [None] * len(gates)
+        readers = [0] * signals
+        for k, (label, operands) in enumerate(gates):
+            if live[n_inputs + k]:
+                node_of[n_inputs + k] = len(labels)
+                labels.append(label)
+                for operand in operands:
+                    readers[operand] += 1
+        for signal in outputs:
+            readers[signal] += 1
+
+        edges = []
+        source = list(node_of)
+        for signal in range(signals):
+            if readers[signal] > 1:
+                source[signal] = len(labels)
+                edges.append((node_of[signal], len(labels)))
+                labels.append(' ')
+        for k, (label, operands) in enumerate(gates):
+            if live[n_inputs + k]:
+                edges.extend((source[operand], node_of[n_inputs + k]) for operand in operands)
+
+        output_ids = []
+        for signal in outputs:
+            output_ids.append(len(labels))
+            edges.append((source[signal], len(labels)))
+            labels.append('')
+
+        return cls.from_edges(len(labels), edges, labels, list(range(n_inputs)), output_ids, validate=False)
     
 
     @classmethod
@@ -175,7 +253,7 @@ class bool_circ(open_digraph):
             return cls.__adder_basecase(half=half)
         
         prev = cls.adder(n-1, half=half)
-        comp = open_digraph.parallel(prev, prev.copy())
+        comp = open_digraph.parallel(prev, prev.copy(), consume=True)
 
         c_in = comp.get_input_ids()[len(comp.get_input_ids()) // 2 - 1]
         c_out = comp.get_output_ids()[len(comp.get_output_ids()) // 2 + 1]
@@ -184,6 +262,7 @@ class bool_circ(open_digraph):
         comp.set_outputs([out for out in comp.get_output_ids() if out != c_out])
 
         comp.add_edge(c_out, c_in) 
+        comp.get_node_by_id(c_in).set_label('') # The inner carry is no longer a (constant) input
         
         size = len(comp.get_input_ids())
 
@@ -197,7 +276,38 @@ class bool_circ(open_digraph):
             comp.remove_edge(inp2, inner2)
             comp.add_edge(inp2, inner1) 
 
-        return bool_circ(comp)
+        return comp
+
+
+    @classmethod
+    def hierarchical_adder(cls, n):
+        '''
+    Generates a hierarchical ripple-carry adder of 2^n bits.
+
+    Level k adds 2^k bits with two instances of level k - 1, the lower half feeding its carry to the upper half;
+    level 0 instantiates the full adder adder(0). Levels are shared, so memory grows with n instead of 2^n.
+
+    Parameters:
+        n (int): The logarithm of the number of bits.
+
+    Returns:
+        hierarchical_circuit: An adder whose inputs are the bits of a (most significant first), the bits of b and
+        the carry in, and whose outputs are the carry out and the bits of the sum (most significant first).
+    '''
+        level = hierarchical_circuit(3)
+        level.set_outputs(level.add_instance(cls.adder(0), [0, 1, 2]))
+
+        for k in range(1, n + 1):
+            half = 2 ** (k - 1)
+            a = list(range(2 * half))
+            b = list(range(2 * half, 4 * half))
+            upper = hierarchical_circuit(4 * half + 1)
+            low = upper.add_instance(level, a[half:] + b[half:] + [4 * half])
+            high = upper.add_instance(level, a[:half] + b[:half] + [low[0]])
+            upper.set_outputs(high + low[1:])
+            level = upper
+
+        return level
 
 
     @classmethod
@@ -283,7 +393,7 @@ class bool_circ(open_digraph):
 
     
     def zero(self, node_id):
-         '''
+        '''
     Sets the label of a node to represent a constant zero.
 
     Sets the label of the specified node in the boolean circuit to represent a constant zero.
@@ -297,6 +407,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label('0')
         self.get_node_by_id(node_id).set_parents({})
         self.get_node_by_id(node_id).set_children({})
+        self._touch()
 
 
     def one(self, node_id):
@@ -314,6 +425,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label('1')
         self.get_node_by_id(node_id).set_parents({})
         self.get_node_by_id(node_id).set_children({})
+        self._touch()
 
 
     def invert(self, node_id):
@@ -353,6 +465,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label(str(input_id))
         self.get_node_by_id(node_id).set_parents({input_id: 1})
         self.get_node_by_id(node_id).set_children({})
+        self._touch()
 
 
     def output_copy(self, node_id, output_id):
@@ -371,6 +484,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label(str(output_id))
         self.get_node_by_id(node_id).set_parents({})
         self.get_node_by_id(node_id).set_children({output_id: 1})
+        self._touch()
 
 
     def and_gate(self, node_id, input_id1, input_id2):
@@ -390,6 +504,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label('&')
         self.get_node_by_id(node_id).set_parents({input_id1: 1, input_id2: 1})
         self.get_node_by_id(node_id).set_children({})
+        self._touch()
 
 
     def or_gate(self, node_id, input_id1, input_id2):
@@ -409,6 +524,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label('|')
         self.get_node_by_id(node_id).set_parents({input_id1: 1, input_id2: 1})
         self.get_node_by_id(node_id).set_children({})
+        self._touch()
 
 
     def xor_gate(self, node_id, input_id1, input_id2):
@@ -428,6 +544,7 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label('^')
         self.get_node_by_id(node_id).set_parents({input_id1: 1, input_id2: 1})
         self.get_node_by_id(node_id).set_children({})
+        self._touch()
 
 
     def fanout(self, node_id, input_id):
@@ -446,57 +563,16 @@ class bool_circ(open_digraph):
         self.get_node_by_id(node_id).set_label(' ')
         self.get_node_by_id(node_id).set_parents({input_id: 1})
         self.get_node_by_id(node_id).set_children({input_id: 1})
+        self._touch()
     
     
     def evaluate(self):
         """
         Evaluates the boolean circuit by updating the labels of each node to reflect the output values based on the inputs.
+        Constants are propagated with the rewrite rules of rewrite_rules, driven by a worklist: only the neighbours of
+        rewritten nodes are examined again. Outputs fed by a constant take its value as label.
         """
-        while True:
-            transformed = False
-            for node_id in self.get_nodes():
-                if len(self.get_node_by_id(node_id).get_children()) == 0 and len(self.get_node_by_id(node_id).get_parents()) == 1:
-                    parent_id = list(self.get_node_by_id(node_id).get_parents().keys())[0]
-                    parent_label = self.get_node_by_id(parent_id).get_label()
-                    if parent_label == '0':
-                        self.zero(node_id)
-                    elif parent_label == '1':
-                        self.one(node_id)
-                    elif parent_label == '~':
-                        self.invert(node_id)
-                    elif parent_label.isdigit():
-                        self.input_copy(node_id, int(parent_label))
-                    elif parent_label == ' ':
-                        grandparent_id = list(self.get_node_by_id(parent_id).get_parents().keys())[0]
-                        grandparent_label = self.get_node_by_id(grandparent_id).get_label()
-                        if grandparent_label in ['&', '|', '^']:
-                            input_id = list(self.get_node_by_id(parent_id).get_parents().keys())[0]
-                            self.get_node_by_id(parent_id).set_label(str(input_id))
-                            self.get_node_by_id(parent_id).set_parents({input_id: 1})
-                            self.get_node_by_id(parent_id).set_children({})
-                        else:
-                            continue
-                    elif parent_label in ['&', '|', '^']:
-                        inputs = list(self.get_node_by_id(parent_id).get_parents().keys())
-                        ready = True
-                        for input_id in inputs:
-                            if input_id not in self.get_node_by_id(parent_id).get_children():
-                                ready = False
-                                break
-                        if ready:
-                            if parent_label == '&':
-                                self.and_gate(node_id, inputs[0], inputs[1])
-                            elif parent_label == '|':
-                                self.or_gate(node_id, inputs[0], inputs[1])
-                            elif parent_label == '^':
-                                self.xor_gate(node_id, inputs[0], inputs[1])
-                    else:
-                        continue
-
-                    transformed = True
-
-            if not transformed:
-                break
+        self.rewrite()
 
 
     @classmethod
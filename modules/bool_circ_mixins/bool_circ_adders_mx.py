@@ -0,0 +1,155 @@
+'''
+Mixin for boolean circuits containing adder generators of arbitrary width.
+All of them follow the port conventions of adder(0): the inputs are the bits of a (most significant first),
+the bits of b (most significant first) and the carry in; the outputs are the carry out and the bits of the sum
+(most significant first)
+'''
+
+class _netlist:
+    '''
+    Gate list under construction, see bool_circ.from_gates
+    '''
+
+
+    def __init__(self, n_inputs):
+        self.n_inputs = n_inputs
+        self.gates = []
+
+
+    def gate(self, label, operands):
+        '''
+        Adds a gate and returns its signal
+        '''
+        self.gates.append((label, list(operands)))
+        return self.n_inputs + len(self.gates) - 1
+
+
+def _adder_ports(width):
+    '''
+    Returns the netlist of an adder of the given width, the signals of the bits of a and b (least significant first)
+    and the signal of the carry in
+    '''
+    if width < 1:
+        raise ValueError("The width of an adder must be positive")
+    net = _netlist(2 * width + 1)
+    a = [width - 1 - i for i in range(width)]
+    b = [2 * width - 1 - i for i in range(width)]
+    return net, a, b, 2 * width
+
+
+def _kogge_stone(m):
+    '''
+    Returns the levels of (i, j) combinations of the Kogge-Stone prefix network over m positions
+    '''
+    levels = []
+    d = 1
+    while d < m:
+        levels.append([(i, i - d) for i in range(d, m)])
+        d *= 2
+    return levels
+
+
+def _brent_kung(m):
+    '''
+    Returns the levels of (i, j) combinations of the Brent-Kung prefix network over m positions
+    '''
+    levels = []
+    d = 1
+    while 2 * d - 1 < m:
+        levels.append([(i, i - d) for i in range(2 * d - 1, m, 2 * d)])
+        d *= 2
+    d //= 2
+    while d >= 1:
+        level = [(i, i - d) for i in range(3 * d - 1, m, 2 * d)]
+        if level:
+            levels.append(level)
+        d //= 2
+    return levels
+
+
+class bool_circ_adders_mx:
+    @classmethod
+    def ripple_carry_adder(cls, width):
+        '''
+        width: int; number of bits of the operands
+        Builds a ripple-carry adder in a single linear pass: five gates per bit, depth linear in the width
+        '''
+        net, a, b, carry = _adder_ports(width)
+        sums = []
+        for i in range(width):
+            p = net.gate('^', [a[i], b[i]])
+            g = net.gate('&', [a[i], b[i]])
+            sums.append(net.gate('^', [p, carry]))
+            carry = net.gate('|', [g, net.gate('&', [p, carry])])
+        return cls.from_gates(net.n_inputs, net.gates, [carry] + sums[::-1])
+
+
+    @classmethod
+    def carry_lookahead_adder(cls, width, block_size=4):
+        '''
+        width: int; number of bits of the operands
+        block_size: int; number of bits of each lookahead block
+        Builds a carry-lookahead adder: inside a block every carry is computed directly from the generate and
+        propagate signals and the carry in of the block (with n-ary gates), carries rippling from block to block
+        '''
+        if block_size < 1:
+            raise ValueError("The block size must be positive")
+        net, a, b, carry = _adder_ports(width)
+        p = [net.gate('^', [a[i], b[i]]) for i in range(width)]
+        g = [net.gate('&', [a[i], b[i]]) for i in range(width)]
+
+        def lookahead(start, i, block_carry):
+            # Carry into bit i, from the bits start to i - 1 of the block and its carry in
+            terms = [g[j] if j == i - 1 else net.gate('&', [g[j]] + p[j + 1:i]) for j in range(start, i)]
+            terms.append(net.gate('&', p[start:i] + [block_carry]))
+            return net.gate('|', terms)
+
+        sums = []
+        for start in range(0, width, block_size):
+            end = min(start + block_size, width)
+            for i in range(start, end):
+                sums.append(net.gate('^', [p[i], carry if i == start else lookahead(start, i, carry)]))
+            carry = lookahead(start, end, carry)
+        return cls.from_gates(net.n_inputs, net.gates, [carry] + sums[::-1])
+
+
+    @classmethod
+    def _prefix_adder(cls, width, network):
+        '''
+        width: int; number of bits of the operands
+        network: function; returns the levels of (i, j) combinations of a prefix network over its argument positions
+        Builds a parallel-prefix adder. Position 0 holds the carry in (generate c, propagate 0) and position i the
+        bit i - 1, so that after the network the generate of position i is the carry into bit i
+        '''
+        net, a, b, carry = _adder_ports(width)
+        p = [net.gate('^', [a[i], b[i]]) for i in range(width)]
+        generate = [carry] + [net.gate('&', [a[i], b[i]]) for i in range(width)]
+        propagate = [None] + p # None stands for the constant 0
+
+        for level in network(width + 1):
+            next_generate, next_propagate = list(generate), list(propagate)
+            for i, j in level:
+                next_generate[i] = net.gate('|', [generate[i], net.gate('&', [propagate[i], generate[j]])])
+                next_propagate[i] = None if propagate[j] is None else net.gate('&', [propagate[i], propagate[j]])
+            generate, propagate = next_generate, next_propagate
+
+        sums = [net.gate('^', [p[i], generate[i]]) for i in range(width)]
+        return cls.from_gates(net.n_inputs, net.gates, [generate[width]] + sums[::-1])
+
+
+    @classmethod
+    def kogge_stone_adder(cls, width):
+        '''
+        width: int; number of bits of the operands
+        Builds a Kogge-Stone parallel-prefix adder: logarithmic depth, O(n log n) gates
+        '''
+        return cls._prefix_adder(width, _kogge_stone)
+
+
+    @classmethod
+    def brent_kung_adder(cls, width):
+        '''
+        width: int; number of bits of the operands
+        Builds a Brent-Kung parallel-prefix adder: logarithmic depth (about twice that of Kogge-Stone), O(n) gates
+        '''
+        return cls._prefix_adder(width, _brent_kung)
@@ -0,0 +1,263 @@
+'''
+Mixin for boolean circuits containing the rewrite rules used to (partially) evaluate and optimize them
+'''
+
+from modules.rewrite_engine import rewrite_engine
+
+def constant_parent(circ, node_id):
+    '''
+    Returns the id of a constant ('0' or '1', without parents) parent of the node, None if there is none
+    '''
+    for parent_id in circ.get_node_by_id(node_id).get_parents():
+        parent = circ.get_node_by_id(parent_id)
+        if parent.get_label() in ('0', '1') and parent.get_parents() == {}:
+            return parent_id
+    return None
+
+
+def _is_port(circ, node_id):
+    return circ.is_input(node_id) or circ.is_output(node_id)
+
+
+def _constant_pattern(labels):
+    '''
+    Returns a pattern matching nodes with one of the given labels and a constant parent
+    '''
+    def pattern(circ, node_id):
+        return (circ.get_node_by_id(node_id).get_label() in labels and not _is_port(circ, node_id)
+                and constant_parent(circ, node_id) is not None)
+    return pattern
+
+
+def copy_constant(circ, node_id):
+    '''
+    A copy of a constant is replaced by one constant per child
+    '''
+    parent_id = constant_parent(circ, node_id)
+    value = circ.get_node_by_id(parent_id).get_label()
+    children = circ.get_node_by_id(node_id).get_children().copy()
+    circ.remove_node_by_id(node_id)
+    affected = [parent_id]
+    for child_id, multiplicity in children.items():
+        for _ in range(multiplicity):
+            affected.append(circ.add_node(value, children={child_id: 1}))
+        affected.append(child_id)
+    return affected
+
+
+def invert_constant(circ, node_id):
+    '''
+    The negation of a constant becomes the opposite constant
+    '''
+    parent_id = constant_parent(circ, node_id)
+    n = circ.get_node_by_id(node_id)
+    circ.remove_parallel_edges(parent_id, node_id)
+    n.set_label('1' if circ.get_node_by_id(parent_id).get_label() == '0' else '0')
+    return [parent_id] + list(n.get_children())
+
+
+def identity_constant(circ, node_id):
+    '''
+    An inner identity node fed by a constant becomes that constant
+    '''
+    parent_id = constant_parent(circ, node_id)
+    n = circ.get_node_by_id(node_id)
+    circ.remove_parallel_edges(parent_id, node_id)
+    n.set_label(circ.get_node_by_id(parent_id).get_label())
+    return [parent_id] + list(n.get_children())
+
+
+def gate_constant(circ, node_id):
+    '''
+    AND, OR and XOR gates with a constant operand:
+    - an absorbing constant (0 for AND, 1 for OR) turns the gate into that constant, its other operands being dropped
+    - a neutral constant (1 for AND, 0 for OR and XOR) is dropped
+    - a 1 operand of a XOR is dropped and the gate is followed by a negation
+    '''
+    parent_id = constant_parent(circ, node_id)
+    n = circ.get_node_by_id(node_id)
+    label = n.get_label()
+    value = circ.get_node_by_id(parent_id).get_label()
+    affected = list(n.get_parents()) + list(n.get_children())
+
+    if (label, value) in (('&', '0'), ('|', '1')):
+        for other_id in list(n.get_parents()):
+            circ.remove_parallel_edges(other_id, node_id)
+        n.set_label(value)
+    elif (label, value) == ('^', '1'):
+        circ.remove_edge(parent_id, node_id)
+        children = n.get_children().copy()
+        for child_id in children:
+            circ.remove_parallel_edges(node_id, child_id)
+        affected.append(circ.add_node('~', parents={node_id: 1}, children=children))
+    else:
+        circ.remove_edge(parent_id, node_id)
+
+    return affected
+
+
+def empty_gate_pattern(circ, node_id):
+    n = circ.get_node_by_id(node_id)
+    return n.get_label() in ('&', '|', '^') and n.get_parents() == {} and not _is_port(circ, node_id)
+
+
+def empty_gate(circ, node_id):
+    '''
+    A gate without operands becomes its neutral element
+    '''
+    n = circ.get_node_by_id(node_id)
+    n.set_label('1' if n.get_label() == '&' else '0')
+    return list(n.get_children())
+
+
+def output_constant_pattern(circ, node_id):
+    if not circ.is_output(node_id):
+        return False
+    parent_id = constant_parent(circ, node_id)
+    return parent_id is not None and circ.get_node_by_id(node_id).get_label() != circ.get_node_by_id(parent_id).get_label()
+
+
+def output_constant(circ, node_id):
+    '''
+    An output fed by a constant takes its value as label
+    '''
+    circ.get_node_by_id(node_id).set_label(circ.get_node_by_id(constant_parent(circ, node_id)).get_label())
+    return []
+
+
+def dead_node_pattern(circ, node_id):
+    return circ.get_node_by_id(node_id).get_children() == {} and not _is_port(circ, node_id)
+
+
+def dead_node(circ, node_id):
+    '''
+    A node whose value is not used by any other node is removed
+    '''
+    parents = list(circ.get_node_by_id(node_id).get_parents())
+    circ.remove_node_by_id(node_id)
+    return parents
+
+
+def double_negation_pattern(circ, node_id):
+    n = circ.get_node_by_id(node_id)
+    if n.get_label() != '~' or _is_port(circ, node_id) or len(n.get_parents()) != 1:
+        return False
+    parent_id = list(n.get_parents())[0]
+    parent = circ.get_node_by_id(parent_id)
+    return (parent.get_label() == '~' and not _is_port(circ, parent_id)
+            and parent.get_children() == {node_id: 1} and len(parent.get_parents()) == 1)
+
+
+def double_negation(circ, node_id):
+    '''
+    Two consecutive negations are removed, the input of the first one feeding the children of the second one
+    '''
+    parent_id = list(circ.get_node_by_id(node_id).get_parents())[0]
+    grandparent_id = list(circ.get_node_by_id(parent_id).get_parents())[0]
+    children = circ.get_node_by_id(node_id).get_children().copy()
+    circ.remove_nodes_by_id([node_id, parent_id])
+    circ.add_edges([[grandparent_id, child_id] for child_id, multiplicity in children.items() for _ in range(multiplicity)])
+    return [grandparent_id] + list(children)
+
+
+def single_copy_pattern(circ, node_id):
+    n = circ.get_node_by_id(node_id)
+    return (n.get_label() in (' ', '') and not _is_port(circ, node_id)
+            and n.indegree() == 1 and n.outdegree() == 1)
+
+
+def single_copy(circ, node_id):
+    '''
+    A copy (or identity) node with a single child is bypassed
+    '''
+    n = circ.get_node_by_id(node_id)
+    parent_id = list(n.get_parents())[0]
+    child_id = list(n.get_children())[0]
+    circ.remove_node_by_id(node_id)
+    circ.add_edge(parent_id, child_id)
+    return [parent_id, child_id]
+
+
+# no node is removed while evaluating: dead gates are only swept by optimize (the dead_gates pass)
+evaluation_rules = [
+    (_constant_pattern([' ']), copy_constant),
+    (_constant_pattern(['~']), invert_constant),
+    (_constant_pattern(['']), identity_constant),
+    (_constant_pattern(['&', '|', '^']), gate_constant),
+    (empty_gate_pattern, empty_gate),
+    (output_constant_pattern, output_constant),
+]
+
+optimization_passes = {
+    'dead_gates': [(dead_node_pattern, dead_node)],
+    'constant_folding': [
+        (_constant_pattern([' ']), copy_constant),
+        (_constant_pattern(['~']), invert_constant),
+        (_constant_pattern(['']), identity_constant),
+        (_constant_pattern(['&', '|', '^']), gate_constant),
+        (empty_gate_pattern, empty_gate),
+    ],
+    'double_negation': [(double_negation_pattern, double_negation)],
+    'copy_removal': [(single_copy_pattern, single_copy)],
+}
+
+
+class bool_circ_rewrite_mx:
+    rewrite_rules = evaluation_rules
+
+    def rewrite(self, rules=None, node_ids=None):
+        '''
+        rules: (function, function) list; rewrite rules (see rewrite_engine), rewrite_rules if None
+        node_ids: int iter; nodes from which to start rewriting, every node if None
+        Rewrites the circuit in place with a worklist: after each rewrite only the affected nodes are examined again.
+        Returns the number of rewrites performed
+        '''
+        return rewrite_engine(self.rewrite_rules if rules is None else rules).run(self, node_ids)
+
+
+    def optimize(self, passes=None):
+        '''
+        passes: str list; names of the passes to run (keys of optimization_passes), all of them if None
+            - constant_folding: propagates constants; inputs labelled '0' or '1' become plain constants
+            - double_negation: removes ~~x chains
+            - copy_removal: bypasses copy and identity nodes with a single child
+            - dead_gates: removes the nodes which do not reach any output
+        Runs the passes together, in place, until none of them applies. The nodes left without children by the passes
+        (e.g. constants dropped by constant_folding) are then removed even without dead_gates, as well as the inputs
+        left without children, so that a well-formed circuit stays well-formed.
+        Returns a dict with the number of nodes and edges removed and of rewrites performed, and the ids of the inputs
+        removed from the interface (constant or unused inputs), in port order
+        '''
+        if passes is None:
+            passes = list(optimization_passes)
+        for name in passes:
+            if name not in optimization_passes:
+                raise ValueError(f"Unknown optimization pass {name}")
+
+        nodes_before = len(self._nodes)
+        edges_before = sum(n.outdegree() for n in self._nodes.values())
+
+        inputs_before = list(self.get_input_ids())
+        if 'constant_folding' in passes:
+            self.set_inputs([input_id for input_id in inputs_before
+                             if self._nodes[input_id].get_label() not in ('0', '1')])
+
+        dead_before = {node_id for node_id, n in self._nodes.items() if n.get_children() == {}}
+        rules = [rule for name in passes for rule in optimization_passes[name]]
+        rewrites = rewrite_engine(rules).run(self)
+        if 'dead_gates' not in passes:
+            rewrites += rewrite_engine(optimization_passes['dead_gates']).run(
+                self, [node_id for node_id, n in self._nodes.items() if n.get_children() == {} and node_id not in dead_before])
+
+        unused = {input_id for input_id in self.get_input_ids() if self._nodes[input_id].get_children() == {}}
+        if unused:
+            self.set_inputs([input_id for input_id in self.get_input_ids() if input_id not in unused])
+            self.remove_nodes_by_id(unused)
+        kept = set(self.get_input_ids())
+
+        return {
+            'nodes_removed': nodes_before - len(self._nodes),
+            'edges_removed': edges_before - sum(n.outdegree() for n in self._nodes.values()),
+            'rewrites': rewrites,
+            'inputs_removed': [input_id for input_id in inputs_before if input_id not in kept],
+        }
@@ -0,0 +1,146 @@
+'''
+Mixin for boolean circuits containing non-destructive simulation methods
+'''
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from modules.compiled_circuit import compiled_circuit, node_operation, OP_COPY, OP_NOT, OP_AND, OP_ONE, OP_OR, OP_ZERO
+from modules.incremental_simulator import incremental_simulator
+from modules.parallel_evaluator import parallel_evaluator
+
+class bool_circ_simulation_mx:
+    def compile(self):
+        '''
+        Levelizes the circuit once into a flat instruction program.
+        The returned compiled_circuit evaluates the circuit in O(V+E) through its run method, without modifying the graph.
+        '''
+        return compiled_circuit.from_circuit(self)
+
+
+    def simulator(self, inputs=None):
+        '''
+        inputs: int list; initial input bits in port order, all zero if None
+        Returns a stateful incremental_simulator caching the value of every node: after set_inputs, only the
+        fan-out cone of the changed inputs is re-evaluated
+        '''
+        return incremental_simulator(self.compile(), inputs)
+
+
+    def simulate(self, vectors, word_size=None):
+        '''
+        vectors: int list list; input vectors, each containing one bit per input (in port order)
+        word_size: int; number of vectors evaluated by each walk over the circuit, all of them at once if None
+        Bitsliced simulation: every wire carries a Python int holding one bit per vector.
+        Returns the list of output vectors
+        '''
+        return self.compile().run_vectors(vectors, word_size)
+
+
+    def evaluate_parallel(self, vectors, workers=None, chunk_size=4096):
+        '''
+        vectors: int list list or ndarray; input vectors (one bit per input, in port order)
+        workers: int; number of worker processes, the number of CPUs if None
+        chunk_size: int; number of vectors evaluated by each task
+        Evaluates the vectors on a process pool, through shared memory buffers (see parallel_evaluator).
+        Returns the output vectors, as an array if vectors is an array
+        '''
+        with parallel_evaluator(self.compile(), workers, chunk_size) as evaluator:
+            return evaluator.evaluate(vectors)
+
+
+    def truth_table(self, chunk_bits=16, start=0):
+        '''
+        chunk_bits: int; each chunk holds 2^chunk_bits input assignments
+        start: int; first assignment to enumerate, used to resume an interrupted enumeration (multiple of the chunk size)
+        Generator enumerating the 2^n assignments of the n inputs, assignment a setting input i to bit i of a.
+        Each chunk is simulated with a single bitsliced walk over the circuit, so memory stays bounded whatever n.
+        Yields (position, count, words) tuples: the chunk covers assignments position to position + count - 1 and
+        bit k of words[j] is output j for assignment position + k. An enumeration interrupted after a chunk
+        resumes with truth_table(chunk_bits, position + count).
+        '''
+        program = self.compile()
+        n = program.input_count()
+        total = 1 << n
+        size = min(1 << chunk_bits, total)
+        if start < 0 or start > total or start % size != 0:
+            raise ValueError(f"The starting assignment must be a multiple of {size} between 0 and {total}")
+
+        # Inputs below log2(size) follow the same periodic pattern in every chunk, the others are constant
+        low_bits = size.bit_length() - 1
+        full = (1 << size) - 1
+        patterns = []
+        for i in range(low_bits):
+            half_period = 1 << i
+            block = ((1 << half_period) - 1) << half_period
+            patterns.append(block * (full // ((1 << (2 * half_period)) - 1)))
+
+        for position in range(start, total, size):
+            words = patterns + [full if (position >> i) & 1 else 0 for i in range(low_bits, n)]
+            yield position, size, program.run_words(words, size)
+
+
+    def evaluate_batch(self, X):
+        '''
+        X: ndarray; (N, n_inputs) array of bits (uint8 or bool), or of packed uint64 words holding 64 patterns each
+        Evaluates the (acyclic) circuit level by level, following topological_sort, each level being computed
+        with vectorized bitwise operations over the gathered columns of its operands.
+        Returns the (N, n_outputs) array of the outputs, with the same dtype as X
+        '''
+        if np is None:
+            raise ImportError("evaluate_batch requires numpy")
+
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != len(self.get_input_ids()):
+            raise ValueError(f"Expected an array of shape (N, {len(self.get_input_ids())})")
+
+        packed = X.dtype == np.uint64
+        if packed:
+            one = np.uint64(0xFFFFFFFFFFFFFFFF)
+            work = X
+        elif X.dtype == np.bool_ or X.dtype == np.uint8:
+            one = np.uint8(1)
+            work = X.astype(np.uint8)
+        else:
+            raise ValueError(f"Unsupported dtype {X.dtype}, expected uint8, bool or uint64")
+
+        levels = self.topological_sort() + [set(self.get_output_ids())]
+        rows = {identity: row for row, identity in enumerate(self.get_input_ids())}
+        for level in levels:
+            for identity in level:
+                rows[identity] = len(rows)
+
+        values = np.empty((len(rows), X.shape[0]), dtype=work.dtype)
+        values[:len(self.get_input_ids())] = work.T
+
+        for level in levels:
+            # Nodes of a level sharing an opcode and an arity are evaluated together
+            groups = {}
+            for identity in level:
+                op, operands = node_operation(self._nodes[identity])
+                dsts, srcs = groups.setdefault((op, len(operands)), ([], []))
+                dsts.append(rows[identity])
+                srcs.append([rows[parent] for parent in operands])
+
+            for (op, arity), (dsts, srcs) in groups.items():
+                if op == OP_ONE or (op == OP_AND and arity == 0):
+                    values[dsts] = one
+                elif op == OP_ZERO or arity == 0:
+                    values[dsts] = 0
+                else:
+                    gathered = values[np.array(srcs)]
+                    if op == OP_COPY:
+                        values[dsts] = gathered[:, 0]
+                    elif op == OP_NOT:
+                        values[dsts] = np.invert(gathered[:, 0]) if packed else np.bitwise_xor(gathered[:, 0], one)
+                    elif op == OP_AND:
+                        values[dsts] = np.bitwise_and.reduce(gathered, axis=1)
+                    elif op == OP_OR:
+                        values[dsts] = np.bitwise_or.reduce(gathered, axis=1)
+                    else:
+                        values[dsts] = np.bitwise_xor.reduce(gathered, axis=1)
+
+        result = values[[rows[identity] for identity in self.get_output_ids()]].T
+        return result.astype(X.dtype)
@@ -0,0 +1,118 @@
+'''
+Mixin for boolean circuits containing structural hashing (merging of structurally identical gates)
+'''
+
+def structural_key(n):
+    '''
+    n: node;
+    Returns the key of a node in the unique table: its label and its canonical (sorted) operands with multiplicities
+    '''
+    return (n.get_label(), tuple(sorted(n.get_parents().items())))
+
+
+class bool_circ_strash_mx:
+    def _unique_table_entry(self, key):
+        '''
+        key: (str, (int, int) tuple); structural key
+        Returns the id of the node of the unique table with the given key, None if there is none.
+        Entries made stale by later modifications of the circuit are dropped.
+        '''
+        identity = self._unique_table.get(key)
+        if identity is None:
+            return None
+        if identity not in self._nodes or structural_key(self._nodes[identity]) != key:
+            del self._unique_table[key]
+            return None
+        return identity
+
+
+    def add_gate(self, label, parents=None):
+        '''
+        label: str; label of the gate
+        parents: int->int dict; maps the ids of the operands to their multiplicity
+        Returns the id of a node computing label over the given operands, only creating it if the unique table
+        does not already contain one
+        '''
+        if parents is None:
+            parents = {}
+        key = (label, tuple(sorted(parents.items())))
+        identity = self._unique_table_entry(key)
+        if identity is None:
+            identity = self.add_node(label, parents=parents)
+            self._unique_table[key] = identity
+        return identity
+
+
+    def _fanout_node(self, identity):
+        '''
+        identity: int; id of a node gaining children
+        Returns the id of the node the new children must be connected to, so that only copy nodes have several
+        children: the node itself if it is a copy or has no child, otherwise its copy child, inserted if needed
+        '''
+        n = self._nodes[identity]
+        children = n.get_children()
+        if n.get_label() == ' ' or not children:
+            return identity
+        if len(children) == 1:
+            child_id, multiplicity = next(iter(children.items()))
+            if multiplicity == 1 and self._nodes[child_id].get_label() == ' ' and not self.is_output(child_id):
+                return child_id
+
+        children = children.copy()
+        old_keys = {child_id: structural_key(self._nodes[child_id]) for child_id in children}
+        for child_id in children:
+            self.remove_parallel_edges(identity, child_id)
+        copy_id = self.add_node(' ', parents={identity:1}, children=children)
+        # the moved children now read the copy node, their entries of the unique table are keyed again
+        for child_id, key in old_keys.items():
+            if self._unique_table.get(key) == child_id:
+                del self._unique_table[key]
+                self._unique_table[structural_key(self._nodes[child_id])] = child_id
+        return copy_id
+
+
+    def _merged_fanout(self, identity):
+        '''
+        identity: int; id of a node about to be merged into its representative
+        Returns the children (id -> multiplicity) to give to the fanout of the representative: the copy nodes of the
+        node are removed and their children taken instead, so that the node and its representative share one copy
+        node and the gates they feed get the same structural keys
+        '''
+        fanout = {}
+        for child_id, multiplicity in list(self._nodes[identity].get_children().items()):
+            child = self._nodes[child_id]
+            if child.get_label() == ' ' and child.get_parents() == {identity: 1} and not self.is_output(child_id):
+                for grandchild_id, m in child.get_children().items():
+                    fanout[grandchild_id] = fanout.get(grandchild_id, 0) + m
+                self.remove_node_by_id(child_id)
+            else:
+                fanout[child_id] = fanout.get(child_id, 0) + multiplicity
+        return fanout
+
+
+    def strash(self):
+        '''
+        Structural hashing: visits the inner nodes in topological order and merges each node into the node of the
+        unique table with the same label and operands, redirecting its fanout. The fanout of a representative
+        which is not a copy node goes through a copy node, into which the copy nodes of the merged node are folded:
+        well-formed circuits stay well-formed, and the gates fed by merged nodes are merged in turn.
+        Returns the number of merged nodes (copy nodes folded included)
+        '''
+        ports = set(self.get_input_ids()) | set(self.get_output_ids())
+        merged = 0
+        for level in self.topological_sort():
+            for identity in sorted(level):
+                if identity in ports or identity not in self._nodes: # folded copy node
+                    continue
+                key = structural_key(self._nodes[identity])
+                representative = self._unique_table_entry(key)
+                if representative is None:
+                    self._unique_table[key] = identity
+                elif representative != identity:
+                    copies = len(self._nodes[identity].get_children())
+                    children = self._merged_fanout(identity)
+                    merged += 1 + copies - len(self._nodes[identity].get_children())
+                    self.remove_node_by_id(identity)
+                    fanout = self._fanout_node(representative)
+                    self.add_edges([[fanout, child] for child, multiplicity in children.items() for _ in range(multiplicity)])
+        return merged
@@ -0,0 +1,296 @@
+'''
+Compiled (levelized) boolean circuits, evaluated without modifying the graph they were built from
+'''
+
+OP_COPY = 0
+OP_NOT = 1
+OP_AND = 2
+OP_OR = 3
+OP_XOR = 4
+OP_ZERO = 5
+OP_ONE = 6
+
+opcodes = {'': OP_COPY, ' ': OP_COPY, '~': OP_NOT, '&': OP_AND, '|': OP_OR, '^': OP_XOR, '0': OP_ZERO, '1': OP_ONE}
+
+bit_chars = {0: '0', 1: '1', '0': '0', '1': '1'}
+
+
+def check_operation(identity, label, op, operand_count):
+    '''
+    identity: int; id of a node which is not an input
+    label: str; label of the node
+    op: int; opcode of the label, -1 if the label is invalid
+    operand_count: int; number of operands of the node (parents, counted with their multiplicity)
+    Raises ValueError if the node cannot be compiled into an instruction
+    '''
+    if op == -1:
+        raise ValueError(f"Node {identity} has invalid label {label!r}")
+    if op in (OP_COPY, OP_NOT) and operand_count != 1:
+        raise ValueError(f"Node {identity} ({label!r}) must have exactly one parent")
+    if op in (OP_ZERO, OP_ONE) and operand_count != 0:
+        raise ValueError(f"Constant node {identity} cannot have parents")
+
+
+def node_operation(n):
+    '''
+    n: node; node of a boolean circuit which is not an input
+    Returns the opcode of the node and the list of its operands (parent ids, repeated according to their multiplicity)
+    '''
+    label = n.get_label()
+    op = opcodes.get(label, -1)
+    operands = [parent for parent, multiplicity in n.get_parents().items() for _ in range(multiplicity)]
+    check_operation(n.get_id(), label, op, len(operands))
+    return op, operands
+
+
+def operate(op, operands, values, mask=1):
+    '''
+    op: int; opcode
+    operands: int sequence; slots of the operands
+    values: int list; one value per slot
+    mask: int; value of a constant one (1 for single bits, 2^W - 1 for W-bit words)
+    Returns the result of a single instruction
+    '''
+    if op == OP_COPY:
+        return values[operands[0]]
+    if op == OP_AND:
+        v = mask
+        for src in operands:
+            v &= values[src]
+        return v
+    if op == OP_XOR:
+        v = 0
+        for src in operands:
+            v ^= values[src]
+        return v
+    if op == OP_OR:
+        v = 0
+        for src in operands:
+            v |= values[src]
+        return v
+    if op == OP_NOT:
+        return values[operands[0]] ^ mask
+    return 0 if op == OP_ZERO else mask
+
+
+def pack_vectors(vectors, width):
+    '''
+    vectors: int list list; stimulus vectors, each containing one bit per wire
+    width: int; number of wires
+    Returns one word per wire, whose bit k is the value of the wire in vectors[k]
+    '''
+    if any(len(vector) != width for vector in vectors):
+        raise ValueError(f"Every vector must contain {width} bits")
+    try:
+        return [int('0' + ''.join(bit_chars[vector[i]] for vector in reversed(vectors)), 2) for i in range(width)]
+    except KeyError:
+        raise ValueError("Vectors must only contain bits")
+
+
+def unpack_words(words, count):
+    '''
+    words: int list; one word per wire
+    count: int; number of patterns held by the words
+    Inverse of pack_vectors: returns the count vectors held by the words
+    '''
+    if count == 0:
+        return []
+    columns = [bin(word)[2:].zfill(count)[-count:][::-1] for word in words]
+    return [[int(column[k]) for column in columns] for k in range(count)]
+
+
+class compiled_circuit:
+    '''
+    Flat instruction program equivalent to a boolean circuit.
+    Every node of the circuit owns a slot. Instructions are (opcode, operand slots, destination slot) triples,
+    ordered so that the operands of an instruction are always computed before it.
+    '''
+
+
+    def __init__(self, program, slot_count, input_slots, output_slots, depth=0, slots=None):
+        '''
+        program: (int, int tuple, int) list; instructions in evaluation order
+        slot_count: int; number of slots used by the program
+        input_slots: int list; slots of the input nodes, in port order
+        output_slots: int list; slots of the output nodes, in port order
+        depth: int; number of levels of the levelized circuit
+        slots: int->int dict; maps the id of each node of the original circuit to its slot
+        '''
+        self._program = program
+        self._slot_count = slot_count
+        self._input_slots = input_slots
+        self._output_slots = output_slots
+        self._depth = depth
+        self._slots = slots if slots is not None else {}
+
+
+    @classmethod
+    def from_circuit(cls, circ):
+        '''
+        circ: bool_circ; (acyclic) circuit to compile
+        Returns the program of the circuit, see from_frozen
+        '''
+        return cls.from_frozen(circ.freeze())
+
+
+    @classmethod
+    def from_frozen(cls, frozen):
+        '''
+        frozen: frozen_digraph; frozen (acyclic) circuit to compile
+        Levelizes the circuit with Kahn's algorithm and returns the corresponding program
+        '''
+        count = frozen.node_count()
+        inputs = set(frozen.get_input_indices())
+
+        indegree = [0 if i in inputs else frozen.indegree(i) for i in range(count)]
+        level = [0] * count
+        ready = [i for i in range(count) if indegree[i] == 0]
+        order = []
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for child, multiplicity in frozen.children(i):
+                if child in inputs:
+                    continue
+                level[child] = max(level[child], level[i] + 1)
+                indegree[child] -= multiplicity
+                if indegree[child] == 0:
+                    ready.append(child)
+
+        if len(order) != count:
+            raise ValueError("Only acyclic circuits can be compiled")
+
+        order.sort(key=lambda i: level[i])
+        slots = [0] * count
+        for slot, i in enumerate(order):
+            slots[i] = slot
+
+        program = []
+        for i in order:
+            if i in inputs:
+                continue
+            op = frozen.get_opcode(i)
+            operands = tuple(slots[parent] for parent, multiplicity in frozen.parents(i) for _ in range(multiplicity))
+            check_operation(frozen.get_id(i), frozen.get_label(i), op, len(operands))
+            program.append((op, operands, slots[i]))
+
+        depth = max(level) + 1 if level else 0
+        return cls(program, count,
+                   [slots[i] for i in frozen.get_input_indices()],
+                   [slots[i] for i in frozen.get_output_indices()],
+                   depth, {frozen.get_id(i): slots[i] for i in range(count)})
+
+
+    def get_program(self):
+        return self._program
+
+
+    def get_input_slots(self):
+        return self._input_slots
+
+
+    def get_output_slots(self):
+        return self._output_slots
+
+
+    def get_depth(self):
+        return self._depth
+
+
+    def get_slot_count(self):
+        return self._slot_count
+
+
+    def get_slot(self, identity):
+        '''
+        identity: int; id of a node of the original circuit
+        Returns the slot holding the value of the node
+        '''
+        if identity not in self._slots:
+            raise ValueError(f"Node {identity} is not part of the compiled circuit")
+        return self._slots[identity]
+
+
+    def input_count(self):
+        return len(self._input_slots)
+
+
+    def output_count(self):
+        return len(self._output_slots)
+
+
+    def _execute(self, values, mask):
+        '''
+        values: int list; one value per slot, the input slots being already set
+        mask: int; value of a constant one (1 for single bits, 2^W - 1 for W-bit words)
+        Runs the program in place on the given slots
+        '''
+        for op, operands, dst in self._program:
+            values[dst] = operate(op, operands, values, mask)
+
+
+    def _load(self, inputs):
+        '''
+        inputs: int list; one value per input
+        Returns fresh slots with the inputs loaded
+        '''
+        if len(inputs) != len(self._input_slots):
+            raise ValueError(f"Expected {len(self._input_slots)} inputs, got {len(inputs)}")
+        values = [0] * self._slot_count
+        for slot, value in zip(self._input_slots, inputs):
+            values[slot] = value
+        return values
+
+
+    def run_slots(self, inputs):
+        '''
+        inputs: int list; one bit (0/1, '0'/'1' or bool) per input, in port order
+        Evaluates the circuit and returns the list of the values of all the slots (see get_slot)
+        '''
+        bits = [int(value) for value in inputs]
+        if any(bit not in (0, 1) for bit in bits):
+            raise ValueError("Inputs must be bits")
+        values = self._load(bits)
+        self._execute(values, 1)
+        return values
+
+
+    def run(self, inputs):
+        '''
+        inputs: int list; one bit (0/1, '0'/'1' or bool) per input, in port order
+        Evaluates the circuit and returns the list of output bits, in port order
+        '''
+        values = self.run_slots(inputs)
+        return [values[slot] for slot in self._output_slots]
+
+
+    def run_words(self, words, count):
+        '''
+        words: int list; one word per input, in port order, each holding count stimulus patterns
+        count: int; number of patterns (W) held by the words
+        Bitsliced evaluation: a single walk over the program evaluates the W patterns at once.
+        Returns one word per output
+        '''
+        mask = (1 << count) - 1
+        values = self._load([word & mask for word in words])
+        self._execute(values, mask)
+        return [values[slot] for slot in self._output_slots]
+
+
+    def run_vectors(self, vectors, word_size=None):
+        '''
+        vectors: int list list; input vectors, each containing one bit per input
+        word_size: int; number of vectors packed in each word, all of them at once if None
+        Evaluates every vector with bitsliced simulation, returns the list of output vectors
+        '''
+        if word_size is None:
+            word_size = max(len(vectors), 1)
+        if word_size <= 0:
+            raise ValueError("The word size must be positive")
+
+        results = []
+        for start in range(0, len(vectors), word_size):
+            chunk = vectors[start:start + word_size]
+            words = self.run_words(pack_vectors(chunk, len(self._input_slots)), len(chunk))
+            results.extend(unpack_words(words, len(chunk)))
+        return results
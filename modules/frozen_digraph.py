@@ -0,0 +1,220 @@
+'''
+Immutable, array-backed (compressed sparse row) snapshots of open directed graphs
+'''
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from modules import node
+from modules.compiled_circuit import compiled_circuit, opcodes
+
+class frozen_digraph:
+    '''
+    Compressed sparse row view of an open directed graph.
+    Nodes are renumbered densely (index i holds the i-th smallest id). The children of node i are
+    child_index[child_offsets[i]:child_offsets[i+1]], with the multiplicities stored at the same positions of
+    child_mult (and likewise for parents). Labels are kept in a list, their opcodes (-1 for labels which are not
+    boolean operations) in an array.
+    '''
+
+
+    def __init__(self, ids, labels, child_offsets, child_index, child_mult, parent_offsets, parent_index, parent_mult,
+                 inputs, outputs, graph_class=None):
+        '''
+        ids: array; original id of each node, sorted
+        labels: str list; label of each node
+        child_offsets, child_index, child_mult: array; CSR representation of the children
+        parent_offsets, parent_index, parent_mult: array; CSR representation of the parents
+        inputs: array; indices of the input nodes, in port order
+        outputs: array; indices of the output nodes, in port order
+        graph_class: type; class of the graph built by thaw, open_digraph if None
+        '''
+        self._ids = ids
+        self._labels = labels
+        self._opcodes = array('b', [opcodes.get(label, -1) for label in labels])
+        self._child_offsets = child_offsets
+        self._child_index = child_index
+        self._child_mult = child_mult
+        self._parent_offsets = parent_offsets
+        self._parent_index = parent_index
+        self._parent_mult = parent_mult
+        self._inputs = inputs
+        self._outputs = outputs
+        self._graph_class = graph_class
+
+
+    @classmethod
+    def from_graph(cls, g):
+        '''
+        g: open_digraph; graph to freeze
+        Returns the frozen snapshot of the graph
+        '''
+        node_map = g._nodes
+        ids = array('q', sorted(node_map))
+        index = {identity: i for i, identity in enumerate(ids)}
+
+        csr = []
+        for neighbours in (node.node.get_children, node.node.get_parents):
+            offsets, indices, mults = array('i', [0]), array('i'), array('i')
+            for identity in ids:
+                for neighbour, multiplicity in neighbours(node_map[identity]).items():
+                    indices.append(index[neighbour])
+                    mults.append(multiplicity)
+                offsets.append(len(indices))
+            csr.extend([offsets, indices, mults])
+
+        return cls(ids, [node_map[identity].get_label() for identity in ids], *csr,
+                   array('i', [index[identity] for identity in g.get_input_ids()]),
+                   array('i', [index[identity] for identity in g.get_output_ids()]),
+                   g.__class__)
+
+
+    def node_count(self):
+        return len(self._ids)
+
+
+    def edge_count(self):
+        return sum(self._child_mult)
+
+
+    def get_id(self, i):
+        return self._ids[i]
+
+
+    def index_of(self, identity):
+        '''
+        identity: int; id of a node of the original graph
+        Returns the dense index of the node
+        '''
+        i = bisect_left(self._ids, identity)
+        if i == len(self._ids) or self._ids[i] != identity:
+            raise ValueError(f"Node {identity} is not part of the graph")
+        return i
+
+
+    def get_label(self, i):
+        return self._labels[i]
+
+
+    def get_opcode(self, i):
+        return self._opcodes[i]
+
+
+    def get_input_indices(self):
+        return self._inputs
+
+
+    def get_output_indices(self):
+        return self._outputs
+
+
+    def get_input_ids(self):
+        return [self._ids[i] for i in self._inputs]
+
+
+    def get_output_ids(self):
+        return [self._ids[i] for i in self._outputs]
+
+
+    def children(self, i):
+        '''
+        Returns the (index, multiplicity) pairs of the children of node i
+        '''
+        start, end = self._child_offsets[i], self._child_offsets[i + 1]
+        return zip(self._child_index[start:end], self._child_mult[start:end])
+
+
+    def parents(self, i):
+        '''
+        Returns the (index, multiplicity) pairs of the parents of node i
+        '''
+        start, end = self._parent_offsets[i], self._parent_offsets[i + 1]
+        return zip(self._parent_index[start:end], self._parent_mult[start:end])
+
+
+    def indegree(self, i):
+        return sum(self._parent_mult[self._parent_offsets[i]:self._parent_offsets[i + 1]])
+
+
+    def outdegree(self, i):
+        return sum(self._child_mult[self._child_offsets[i]:self._child_offsets[i + 1]])
+
+
+    def distances(self, src, direction=None):
+        '''
+        src: int; id of the source node
+        direction: int; None to follow edges both ways, 1 for children only, -1 for parents only
+        Breadth-first search, returns the dict mapping the id of each reached node to its distance from src
+        '''
+        start = self.index_of(src)
+        dist = {start: 0}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            neighbours = []
+            if direction != -1:
+                neighbours.extend(self._child_index[self._child_offsets[i]:self._child_offsets[i + 1]])
+            if direction != 1:
+                neighbours.extend(self._parent_index[self._parent_offsets[i]:self._parent_offsets[i + 1]])
+            for j in neighbours:
+                if j not in dist:
+                    dist[j] = dist[i] + 1
+                    queue.append(j)
+        return {self._ids[i]: d for i, d in dist.items()}
+
+
+    def topological_sort(self):
+        '''
+        Returns the topological sort of the (acyclic) graph, as a list of sets of node ids,
+        inputs and outputs being left out (as in open_digraph.topological_sort)
+        '''
+        ports = set(self._inputs) | set(self._outputs)
+        indegree = array('i', [0]) * len(self._ids)
+        for i in range(len(self._ids)):
+            if i in ports:
+                continue
+            for j, multiplicity in self.parents(i):
+                if j not in ports:
+                    indegree[i] += multiplicity
+
+        level = [i for i in range(len(self._ids)) if indegree[i] == 0 and i not in ports]
+        top_sort = []
+        sorted_count = 0
+        while level:
+            top_sort.append({self._ids[i] for i in level})
+            sorted_count += len(level)
+            next_level = []
+            for i in level:
+                for j, multiplicity in self.children(i):
+                    if j in ports:
+                        continue
+                    indegree[j] -= multiplicity
+                    if indegree[j] == 0:
+                        next_level.append(j)
+            level = next_level
+
+        if sorted_count != len(self._ids) - len(ports):
+            raise ValueError("The graph is cyclic")
+        return top_sort
+
+
+    def compile(self):
+        '''
+        Returns the compiled_circuit of the frozen (boolean circuit) graph
+        '''
+        return compiled_circuit.from_frozen(self)
+
+
+    def thaw(self):
+        '''
+        Returns a mutable graph (of the class of the frozen graph) equal to the frozen graph
+        '''
+        from modules.open_digraph import open_digraph
+        nodes = [node.node(self._ids[i], self._labels[i],
+                           {self._ids[j]: m for j, m in self.parents(i)},
+                           {self._ids[j]: m for j, m in self.children(i)}) for i in range(len(self._ids))]
+        g = open_digraph(self.get_input_ids(), self.get_output_ids(), nodes)
+        if self._graph_class is None or self._graph_class is open_digraph:
+            return g
+        return self._graph_class(g)
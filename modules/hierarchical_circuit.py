@@ -0,0 +1,288 @@
+'''
+Hierarchical boolean circuits: netlists of instances of shared sub-circuit definitions
+'''
+
+from modules.bool_circ_mixins.bool_circ_rewrite_mx import optimization_passes
+
+def _is_hierarchical(definition):
+    return isinstance(definition, hierarchical_circuit)
+
+
+def _port_counts(definition):
+    '''
+    definition: bool_circ or hierarchical_circuit;
+    Returns the numbers of inputs and outputs of the definition
+    '''
+    if _is_hierarchical(definition):
+        return definition.input_count(), definition.output_count()
+    return len(definition.get_input_ids()), len(definition.get_output_ids())
+
+
+def _program(circ, programs):
+    '''
+    circ: bool_circ; flat definition
+    programs: dict; compiled definitions of the current evaluation, by id
+    Returns the compiled_circuit of the definition, compiled once per evaluation.
+    Programs are not kept on the definition: its labels may change (node.set_label) without it noticing
+    '''
+    if id(circ) not in programs:
+        programs[id(circ)] = circ.compile()
+    return programs[id(circ)]
+
+
+def _flat_arrivals(circ, input_arrivals):
+    '''
+    circ: bool_circ; flat (acyclic) definition
+    input_arrivals: list; arrival depth of each input, None for inputs which are not reached
+    Returns the arrival depth of each output (the length of the longest path from a reached input), None if unreached
+    '''
+    arrival = {input_id: depth for input_id, depth in zip(circ.get_input_ids(), input_arrivals) if depth is not None}
+    for level in circ.topological_sort():
+        for node_id in level:
+            reached = [arrival[parent_id] for parent_id in circ._nodes[node_id].get_parents() if parent_id in arrival]
+            if reached:
+                arrival[node_id] = 1 + max(reached)
+    outputs = []
+    for output_id in circ.get_output_ids():
+        reached = [arrival[parent_id] for parent_id in circ._nodes[output_id].get_parents() if parent_id in arrival]
+        outputs.append(1 + max(reached) if reached else None)
+    return outputs
+
+
+class hierarchical_circuit:
+    '''
+    Boolean circuit made of instances of definitions, which are flat circuits (bool_circ) or hierarchical circuits.
+    Values travel on signals: signals 0 to n_inputs - 1 are the inputs of the circuit, each instance then creates
+    one signal per output of its definition. Definitions are shared, not copied, between their instances, so that
+    a regular design costs memory proportional to its distinct building blocks and its number of instances.
+    Simulation and analysis work hierarchically, computing what they need once per definition;
+    flatten builds the equivalent flat circuit.
+    '''
+
+
+    def __init__(self, n_inputs):
+        '''
+        n_inputs: int; number of inputs of the circuit
+        '''
+        self._input_count = n_inputs
+        self._signal_count = n_inputs
+        self._instances = [] # (definition, operand signals, first output signal) list
+        self._outputs = []
+        self._cache = {}
+
+
+    def input_count(self):
+        return self._input_count
+
+
+    def output_count(self):
+        return len(self._outputs)
+
+
+    def get_outputs(self):
+        return self._outputs
+
+
+    def get_instances(self):
+        return self._instances
+
+
+    def add_instance(self, definition, operands):
+        '''
+        definition: bool_circ or hierarchical_circuit; sub-circuit instantiated (not copied)
+        operands: int list; signals bound to the inputs of the definition, in port order
+        Returns the list of the signals of the outputs of the instance, in port order
+        '''
+        n_in, n_out = _port_counts(definition)
+        if len(operands) != n_in:
+            raise ValueError(f"The definition has {n_in} inputs, {len(operands)} signals were given")
+        if any(not 0 <= signal < self._signal_count for signal in operands):
+            raise ValueError("Operands must be existing signals")
+        first = self._signal_count
+        self._instances.append((definition, list(operands), first))
+        self._signal_count += n_out
+        self._cache = {}
+        return list(range(first, first + n_out))
+
+
+    def set_outputs(self, signals):
+        '''
+        signals: int list; signals of the outputs of the circuit, in port order
+        '''
+        if any(not 0 <= signal < self._signal_count for signal in signals):
+            raise ValueError("Outputs must be existing signals")
+        self._outputs = list(signals)
+        self._cache = {}
+
+
+    def definitions(self):
+        '''
+        Returns the list of the distinct definitions used (recursively) by the circuit, each of them once
+        '''
+        seen = {}
+        stack = [self]
+        while stack:
+            circ = stack.pop()
+            for definition, _, _ in circ.get_instances():
+                if id(definition) not in seen:
+                    seen[id(definition)] = definition
+                    if _is_hierarchical(definition):
+                        stack.append(definition)
+        return list(seen.values())
+
+
+    def _run(self, bits, results, programs):
+        values = list(bits)
+        for definition, operands, _ in self._instances:
+            operand_bits = tuple(values[signal] for signal in operands)
+            key = (id(definition), operand_bits)
+            if key not in results:
+                if _is_hierarchical(definition):
+                    results[key] = definition._run(operand_bits, results, programs)
+                else:
+                    results[key] = _program(definition, programs).run(operand_bits)
+            values.extend(results[key])
+        return [values[signal] for signal in self._outputs]
+
+
+    def run(self, inputs):
+        '''
+        inputs: int list; one bit (0/1, '0'/'1' or bool) per input, in port order
+        Evaluates the circuit hierarchically: each definition is compiled once, and evaluated once per distinct
+        assignment of its inputs. Returns the list of output bits, in port order
+        '''
+        bits = [int(value) for value in inputs]
+        if len(bits) != self._input_count:
+            raise ValueError(f"The circuit has {self._input_count} inputs")
+        if any(bit not in (0, 1) for bit in bits):
+            raise ValueError("Inputs must be bits")
+        return self._run(bits, {}, {})
+
+
+    def run_words(self, words, count):
+        '''
+        words: int list; one word per input, in port order, each holding count stimulus patterns
+        count: int; number of patterns held by the words
+        Bitsliced evaluation (see compiled_circuit.run_words), instance by instance. Returns one word per output
+        '''
+        if len(words) != self._input_count:
+            raise ValueError(f"The circuit has {self._input_count} inputs")
+        mask = (1 << count) - 1
+        return self._run_words([word & mask for word in words], count, {})
+
+
+    def _run_words(self, words, count, programs):
+        values = list(words)
+        for definition, operands, _ in self._instances:
+            operand_words = [values[signal] for signal in operands]
+            if _is_hierarchical(definition):
+                values.extend(definition._run_words(operand_words, count, programs))
+            else:
+                values.extend(_program(definition, programs).run_words(operand_words, count))
+        return [values[signal] for signal in self._outputs]
+
+
+    def _hops(self):
+        '''
+        Returns the number of edges between the source of each signal and its readers in the flattened circuit:
+        2 when the signal is read several times (through a copy node), 1 otherwise
+        '''
+        if 'hops' not in self._cache:
+            readers = [0] * self._signal_count
+            for _, operands, _ in self._instances:
+                for signal in operands:
+                    readers[signal] += 1
+            for signal in self._outputs:
+                readers[signal] += 1
+            self._cache['hops'] = [2 if count > 1 else 1 for count in readers]
+        return self._cache['hops']
+
+
+    def _arrivals(self, input_arrivals, results):
+        hops = self._hops()
+        values = list(input_arrivals)
+        for definition, operands, _ in self._instances:
+            key = (id(definition), tuple(None if values[signal] is None else values[signal] + hops[signal]
+                                         for signal in operands))
+            if key not in results:
+                if _is_hierarchical(definition):
+                    results[key] = definition._arrivals(key[1], results)
+                else:
+                    results[key] = _flat_arrivals(definition, key[1])
+            values.extend(results[key])
+        return [None if values[signal] is None else values[signal] + hops[signal] for signal in self._outputs]
+
+
+    def arrivals(self, input_arrivals=None):
+        '''
+        input_arrivals: list; arrival depth of each input, None for inputs which are not reached, all 0 if None
+        Computes hierarchically the arrival depth of each output in the flattened circuit (the length of the longest
+        path from a reached input), each definition being analysed once per distinct arrival pattern of its inputs.
+        Returns the list of the arrival depths of the outputs, None for the outputs which are not reached
+        '''
+        if input_arrivals is None:
+            input_arrivals = [0] * self._input_count
+        if len(input_arrivals) != self._input_count:
+            raise ValueError(f"The circuit has {self._input_count} inputs")
+        return self._arrivals(input_arrivals, {})
+
+
+    def depth(self):
+        '''
+        Returns the length of the longest path from an input to an output of the flattened circuit.
+        Not cached: the definitions may change without the circuit noticing (see _program)
+        '''
+        return max((depth for depth in self.arrivals() if depth is not None), default=0)
+
+
+    def flatten(self):
+        '''
+        Returns the equivalent flat bool_circ. The ports of each instance become identity nodes,
+        signals read several times go through a copy node, and the logic only feeding unread signals is removed.
+        Each definition is flattened once
+        '''
+        from modules.bool_circ import bool_circ
+        return self._flatten(bool_circ, {})
+
+
+    def _flatten(self, circuit_class, flat_definitions):
+        flat = circuit_class()
+        sources = [flat.add_node('') for _ in range(self._input_count)]
+        flat.set_inputs(list(sources))
+        readers = [[] for _ in range(self._signal_count)]
+
+        for definition, operands, _ in self._instances:
+            if id(definition) not in flat_definitions:
+                flat_definitions[id(definition)] = (definition._flatten(circuit_class, flat_definitions)
+                                                    if _is_hierarchical(definition) else definition)
+            n_in = len(flat.get_input_ids())
+            n_out = len(flat.get_output_ids())
+            flat.iparallel(flat_definitions[id(definition)])
+            pins_in = flat.get_input_ids()[n_in:]
+            pins_out = flat.get_output_ids()[n_out:]
+            flat.set_inputs(flat.get_input_ids()[:n_in])
+            flat.set_outputs(flat.get_output_ids()[:n_out])
+            for signal, pin in zip(operands, pins_in):
+                flat.get_node_by_id(pin).set_label('')
+                readers[signal].append(pin)
+            sources.extend(pins_out)
+
+        outputs = []
+        for signal in self._outputs:
+            output_id = flat.add_node('')
+            readers[signal].append(output_id)
+            outputs.append(output_id)
+
+        unread = []
+        for signal, signal_readers in enumerate(readers):
+            if len(signal_readers) == 1:
+                flat.add_edge(sources[signal], signal_readers[0])
+            elif len(signal_readers) > 1:
+                copy = flat.add_node(' ', parents={sources[signal]: 1})
+                flat.add_edges([[copy, reader] for reader in signal_readers])
+            elif signal >= self._input_count:
+                unread.append(sources[signal])
+        flat.set_outputs(outputs)
+        # output pins of instances which nothing reads are swept, with the logic only feeding them
+        flat.rewrite(optimization_passes['dead_gates'], unread)
+        return flat
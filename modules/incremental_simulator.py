@@ -0,0 +1,87 @@
+'''
+Stateful simulation of boolean circuits, re-evaluating only what changes when some inputs change
+'''
+
+import heapq
+
+from modules.compiled_circuit import operate
+
+class incremental_simulator:
+    '''
+    Simulator caching the value of every node of a compiled circuit.
+    Slots of a compiled circuit are numbered by level, so a slot is always greater than the slots of its operands
+    and propagating changes in increasing slot order evaluates each node at most once per update.
+    '''
+
+
+    def __init__(self, program, inputs=None):
+        '''
+        program: compiled_circuit; circuit to simulate
+        inputs: int list; initial input bits in port order, all zero if None
+        '''
+        self._program = program
+        self._input_slots = set(program.get_input_slots())
+        self._instructions = [None] * program.get_slot_count()
+        self._fanout = [[] for _ in range(program.get_slot_count())]
+        for op, operands, dst in program.get_program():
+            self._instructions[dst] = (op, operands)
+            for src in set(operands):
+                self._fanout[src].append(dst)
+
+        if inputs is None:
+            inputs = [0] * program.input_count()
+        self._values = program.run_slots(inputs)
+
+
+    def set_inputs(self, assignment):
+        '''
+        assignment: int->int dict; maps input node ids to their new bit
+        Updates the given inputs and propagates the changes through their fan-out cone, stopping wherever the value
+        of a node does not change. Returns the number of nodes that were re-evaluated
+        '''
+        dirty = []
+        queued = set()
+        for identity, value in assignment.items():
+            slot = self._program.get_slot(identity)
+            if slot not in self._input_slots:
+                raise ValueError(f"Node {identity} is not an input of the circuit")
+            bit = int(value)
+            if bit not in (0, 1):
+                raise ValueError("Inputs must be bits")
+            if self._values[slot] != bit:
+                self._values[slot] = bit
+                for child in self._fanout[slot]:
+                    if child not in queued:
+                        queued.add(child)
+                        heapq.heappush(dirty, child)
+
+        evaluated = 0
+        while dirty:
+            slot = heapq.heappop(dirty)
+            op, operands = self._instructions[slot]
+            value = operate(op, operands, self._values)
+            evaluated += 1
+            if value != self._values[slot]:
+                self._values[slot] = value
+                for child in self._fanout[slot]:
+                    if child not in queued:
+                        queued.add(child)
+                        heapq.heappush(dirty, child)
+
+        return evaluated
+
+
+    def get_value(self, identity):
+        '''
+        identity: int; id of a node of the circuit
+        Returns the cached value of the node
+        '''
+        return self._values[self._program.get_slot(identity)]
+
+
+    def get_inputs(self):
+        return [self._values[slot] for slot in self._program.get_input_slots()]
+
+
+    def get_outputs(self):
+        return [self._values[slot] for slot in self._program.get_output_slots()]
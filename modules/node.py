@@ -8,6 +8,7 @@ class node:
     Nodes only know local information about the graph. Therefore, methods that modify a node's connections in one 
     direction do not do so for the other direction.
     '''
+    __slots__ = ('_id', '_label', '_parents', '_children')
 
 
     def __init__(self, identity, label, parents, children):
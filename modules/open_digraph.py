@@ -2,7 +2,16 @@
 Module containing an implementation of open directed graphs
 '''
 
+import heapq
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from modules import node
+from modules.frozen_digraph import frozen_digraph
 from modules.open_digraph_mixins.open_digraph_composition_mx import open_digraph_composition_mx
 from modules.open_digraph_mixins.open_digraph_factory_mx import open_digraph_factory_mx
 from modules.open_digraph_mixins.open_digraph_io_mx import open_digraph_io_mx
@@ -20,9 +29,149 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         outputs: int list; the ids of the output nodes
         nodes: node iter;
         '''
-        self._inputs = inputs
-        self._outputs = outputs
+        self._version = 0 # bumped by every mutation, see _cached
+        self._cache = {}
+        self._cache_version = 0
+        self.set_inputs(inputs)
+        self.set_outputs(outputs)
         self._nodes = {node.get_id():node for node in nodes} # self.nodes: <int,node> dict
+        self._cow = False # True while nodes may be shared with copies of the graph, see copy
+        self._owned = set() # ids of the nodes privatized since the last copy
+        self._handed_out = set(self._nodes) # ids of the nodes whose objects the caller may hold, see _share
+        self._handed_out_all = False # True once the whole node map was handed out (get_nodes, get_node_map)
+        self._init_id_allocator()
+
+
+    @classmethod
+    def _from_nodes(cls, inputs, outputs, nodes):
+        '''
+        inputs: int list; the ids of the input nodes
+        outputs: int list; the ids of the output nodes
+        nodes: node iter; nodes of the graph, used as is (not copied)
+        Returns a graph of the class built around the given nodes
+        '''
+        g = cls.__new__(cls)
+        open_digraph.__init__(g, inputs, outputs, nodes)
+        g._handed_out = set()
+        return g
+
+
+    def _is_handed_out(self, identity):
+        '''
+        Returns True if the caller may hold the node object with the given id (see get_node_by_id)
+        '''
+        return self._handed_out_all or identity in self._handed_out
+
+
+    def _shared_node(self, identity):
+        '''
+        Returns the node with the given id as it must be placed in another graph sharing the nodes of this one:
+        a node already handed out is copied, so that modifying it only affects this graph
+        '''
+        n = self._nodes[identity]
+        return n.copy() if self._is_handed_out(identity) else n
+
+
+    def _share(self, private=()):
+        '''
+        private: int iter; ids of the nodes of the graph which are not shared (see _shared_node)
+        Marks every other node of the graph as shared: it is copied before its first modification (copy on write).
+        The nodes already handed out stay private, since they were not given to the other graphs
+        '''
+        self._cow = True
+        self._owned = set(self._nodes) if self._handed_out_all else set(self._handed_out)
+        self._owned.update(private)
+
+
+    def _own(self, identity):
+        '''
+        Returns the node with the given id, copying it first if it may be shared with another graph
+        '''
+        n = self._nodes[identity]
+        if self._cow and identity not in self._owned:
+            n = n.copy()
+            self._nodes[identity] = n
+            self._owned.add(identity)
+        return n
+
+
+    def _own_all(self):
+        '''
+        Copies every node which may be shared with another graph, before handing out all the nodes
+        '''
+        if self._cow:
+            for identity, n in self._nodes.items():
+                if identity not in self._owned:
+                    self._nodes[identity] = n.copy()
+            self._cow = False
+            self._owned = set()
+
+
+    def _insert(self, n):
+        '''
+        Inserts a node which belongs to no other graph in the node map
+        '''
+        self._nodes[n.get_id()] = n
+        self._next_id = max(self._next_id, n.get_id() + 1)
+        if self._cow:
+            self._owned.add(n.get_id())
+
+
+    def _touch(self):
+        '''
+        Records a mutation of the graph, invalidating the cached analyses.
+        Must be called by every method modifying the nodes, the edges or the ports of the graph
+        '''
+        self._version += 1
+
+
+    def get_version(self):
+        '''
+        Returns the mutation counter of the graph
+        '''
+        return self._version
+
+
+    def _cached(self, key, compute):
+        '''
+        key: str; name of the analysis
+        compute: function; computes the analysis when it is not cached for the current version of the graph
+        Returns the result of the analysis, computed at most once per version of the graph
+        '''
+        if self._cache_version != self._version:
+            self._cache = {}
+            self._cache_version = self._version
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+
+    def _init_id_allocator(self, reuse_ids=False):
+        '''
+        reuse_ids: bool; if True, ids freed by remove_node_by_id are allocated again
+        Starts allocating ids after the largest id of the graph
+        '''
+        self._next_id = max(self._nodes, default=-1) + 1 # above every id of the graph, see id_bound
+        self._reuse_ids = reuse_ids
+        self._free_ids = [] # min-heap of freed ids
+
+
+    def id_bound(self):
+        '''
+        Returns, in O(1), an integer greater than every id of the graph (max_id() + 1 unless the largest nodes
+        were removed)
+        '''
+        return self._next_id
+
+
+    def set_id_reuse(self, reuse_ids):
+        '''
+        reuse_ids: bool; if True, ids freed by remove_node_by_id are allocated again (smallest first),
+        otherwise ids are allocated monotonically
+        '''
+        self._reuse_ids = reuse_ids
+        if not reuse_ids:
+            self._free_ids = []
 
 
     def get_input_ids(self):
@@ -30,7 +179,16 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
     
 
     def set_inputs(self, inputs):
+        '''
+        inputs: int list; the ids of the input nodes, in port order
+        '''
         self._inputs = inputs
+        self._input_set = set(inputs)
+        self._touch()
+
+
+    def is_input(self, identity):
+        return identity in self._input_set
 
 
     def add_input_id(self, identity):
@@ -38,10 +196,12 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         identity: int;
         Adds the node with the given id a an input to the graph.
         '''
-        if identity not in self.get_node_ids():
+        if identity not in self._nodes:
             raise ValueError("The provided id does not correspond to a node of the graph")
         
         self._inputs.append(identity)
+        self._input_set.add(identity)
+        self._touch()
 
 
     def get_output_ids(self):
@@ -49,7 +209,16 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
     
 
     def set_outputs(self, outputs):
+        '''
+        outputs: int list; the ids of the output nodes, in port order
+        '''
         self._outputs = outputs
+        self._output_set = set(outputs)
+        self._touch()
+
+
+    def is_output(self, identity):
+        return identity in self._output_set
 
 
     def add_output_id(self, identity):
@@ -57,16 +226,22 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         identity: int;
         Adds the node with the given id as an output to the graph.
         '''
-        if identity not in self.get_node_ids():
+        if identity not in self._nodes:
             raise ValueError("The provided id does not correspond to a node of the graph")
         self._outputs.append(identity)
+        self._output_set.add(identity)
+        self._touch()
 
 
     def get_node_map(self):
+        self._own_all()
+        self._handed_out_all = True
         return self._nodes
     
 
     def get_nodes(self):
+        self._own_all()
+        self._handed_out_all = True
         return list(self._nodes.values())
     
 
@@ -75,7 +250,9 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
     
 
     def get_node_by_id(self, id):
-        return self._nodes[id]
+        n = self._own(id)
+        self._handed_out.add(id)
+        return n
     
 
     def get_nodes_by_ids(self, id_list):
@@ -84,9 +261,18 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
     
     def new_id(self):
         '''
-        Returns an id that is not currently used in the graph
+        Returns an id that is not currently used in the graph, in amortized O(1)
         '''
-        return max([-1] + self.get_node_ids()) + 1
+        while self._free_ids:
+            identity = heapq.heappop(self._free_ids)
+            if identity not in self._nodes:
+                return identity
+
+        # Nodes may have been inserted directly in the node map (composition), skip their ids
+        while self._next_id in self._nodes:
+            self._next_id += 1
+        self._next_id += 1
+        return self._next_id - 1
 
     
     def add_edge(self, src, tgt):
@@ -95,11 +281,12 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         tgt: int; id of the target node
         Adds an edge between the source and the target
         '''
-        if src in self._outputs or tgt in self._inputs:
+        if src in self._output_set or tgt in self._input_set:
             raise ValueError("This edge cannot be added while maintaining input and output nodes")
         
-        self.get_node_by_id(src).add_child_id(tgt)
-        self.get_node_by_id(tgt).add_parent_id(src)
+        self._own(src).add_child_id(tgt)
+        self._own(tgt).add_parent_id(src)
+        self._touch()
 
 
     def add_edges(self, edges):
@@ -122,9 +309,10 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
             children = {}
 
         new_id = self.new_id()
-        new_node = node.node(new_id, label, parents, children)
+        new_node = node.node(new_id, label, {}, {})
         
-        self._nodes[new_id] = new_node
+        self._insert(new_node)
+        self._touch()
 
         self.add_edges([[parent, new_id] for parent in parents for i in range(parents[parent])])
         self.add_edges([[new_id, child] for child in children for i in range(children[child])])
@@ -139,8 +327,9 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         tgt: int; id of the target node
         Removes the edge between the given nodes
         '''
-        self._nodes[src].remove_child_once(tgt)
-        self._nodes[tgt].remove_parent_once(src)
+        self._own(src).remove_child_once(tgt)
+        self._own(tgt).remove_parent_once(src)
+        self._touch()
 
 
     def remove_edges(self, edges):
@@ -158,8 +347,9 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         tgt: int; id of the target node
         Removes all edges between the given nodes
         '''
-        self._nodes[src].remove_child_id(tgt)
-        self._nodes[tgt].remove_parent_id(src)
+        self._own(src).remove_child_id(tgt)
+        self._own(tgt).remove_parent_id(src)
+        self._touch()
 
 
     def remove_several_parallel_edges(self, node_pairs):
@@ -185,6 +375,11 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
             self.remove_parallel_edges(id, child)
 
         del self._nodes[id]
+        self._owned.discard(id)
+        self._handed_out.discard(id)
+        self._touch()
+        if self._reuse_ids:
+            heapq.heappush(self._free_ids, id)
 
 
     def remove_nodes_by_id(self, id_list):
@@ -199,18 +394,14 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
 
     def is_cyclic(self):
         '''
-        Returns True if the graph is cyclic, False otherwise
+        Returns True if the graph is cyclic, False otherwise.
+        Runs in O(V+E) on top of strongly_connected_components
         '''
-        copied_graph = self.copy()
-        while copied_graph.get_nodes() != []:
-            cyclic = True
-            for n in copied_graph.get_nodes():
-                if n.outdegree() == 0:
-                    copied_graph.remove_node_by_id(n.get_id())
-                    cyclic = False
-                    break
-
-            if cyclic:
+        for component in self.strongly_connected_components():
+            if len(component) > 1:
+                return True
+            identity = next(iter(component))
+            if identity in self._nodes[identity].get_children():
                 return True
 
         return False
@@ -226,9 +417,9 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         - If j has i as a child, with multiplicity m, then i must have j as a parent, 
         with multiplicity m (and viceversa)
         '''
-        c1 = all(input_id in self.get_node_ids() for input_id in self._inputs)
+        c1 = all(input_id in self._nodes for input_id in self._inputs)
 
-        c2 = all(output_id in self.get_node_ids() for output_id in self._outputs)
+        c2 = all(output_id in self._nodes for output_id in self._outputs)
 
         c3 = all(len(self._nodes[input_id].get_children()) == 1 and
                 len(self._nodes[input_id].get_parents()) == 0 for input_id in self._inputs)
@@ -238,31 +429,56 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         
         c5 = all(n.get_id() == id for id, n in self._nodes.items())
 
-        for n in self.get_nodes():
-            for parent_id in n.get_parents():
-                if not(parent_id in self.get_node_ids()):
-                    return False
-        
-                parent = self._nodes[parent_id]
-
-                if not(n.get_id() in parent.get_children().keys()) or n.get_parents()[parent_id] != parent.get_children()[n.get_id()]:
-                    return False
-            
-            for child_id in n.get_children():
-                if not(child_id in self.get_node_ids()):
-                    return False
-        
-                child = self._nodes[child_id]
-
-                if not(n.get_id() in child.get_parents().keys()) or n.get_children()[child_id] != child.get_parents()[n.get_id()]:
+        # Each parent entry must match a child entry: if there are as many child entries as parent entries,
+        # every child entry is then matched as well
+        parent_entries = child_entries = 0
+        for node_id, n in self._nodes.items():
+            parents = n.get_parents()
+            parent_entries += len(parents)
+            child_entries += len(n.get_children())
+            for parent_id, multiplicity in parents.items():
+                parent = self._nodes.get(parent_id)
+                if parent is None or parent.get_children().get(node_id) != multiplicity:
                     return False
+        if parent_entries != child_entries:
+            return False
 
         return c1 and c2 and c3 and c4 and c5
     
 
-    def adjacency_matrix(self):
-        # To be completed. Exercice 9 of 3rd session.
-        raise NotImplementedError()
+    def adjacency_matrix(self, format="dense"):
+        '''
+        format: str; "dense" or "csr"
+        Returns (M, ids): the adjacency matrix of the graph and the (sorted) id of the node of each row and column.
+        M[i][j] is the multiplicity of the edge from ids[i] to ids[j]
+            - dense: an (n, n) NumPy array, nested lists if NumPy is unavailable
+            - csr: a (data, indices, indptr) tuple of arrays, as accepted by scipy.sparse.csr_matrix
+        open_digraph.from_adjacency_matrix(M, inputs, outputs, ids=ids) builds the graph back
+        '''
+        if format not in ("dense", "csr"):
+            raise ValueError(f"Invalid value {format} for format parameter.")
+        ids = sorted(self._nodes)
+        index = {identity: i for i, identity in enumerate(ids)}
+
+        data, indices, indptr = array('i'), array('i'), array('i', [0])
+        for identity in ids:
+            for child_id, multiplicity in sorted(self._nodes[identity].get_children().items()):
+                indices.append(index[child_id])
+                data.append(multiplicity)
+            indptr.append(len(indices))
+        if format == "csr":
+            return (data, indices, indptr), ids
+
+        n = len(ids)
+        if np is not None:
+            M = np.zeros((n, n), dtype=np.int64)
+            M[np.repeat(np.arange(n), np.diff(np.asarray(indptr))), np.asarray(indices, dtype=np.intp)] = np.asarray(data)
+            return M, ids
+        M = [[0] * n for _ in range(n)]
+        for i in range(n):
+            for k in range(indptr[i], indptr[i + 1]):
+                M[i][indices[k]] = data[k]
+        return M, ids
 
     
     def min_id(self):
@@ -284,15 +500,23 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
         n: int; number by which to translate all indices (could be negative)
         Shifts the indices of all nodes inside a graph
         '''
-        self._inputs = [inp + n for inp in self._inputs]
-        self._outputs = [outp + n for outp in self._outputs]
-
-        for node in self.get_nodes():
-            node.set_id(node.get_id() + n)
-            node.set_parents({key + n : value for key, value in node.get_parents().items()})
-            node.set_children({key + n : value for key, value in node.get_children().items()})
-
-        self._nodes = {node.get_id():node for node in self.get_nodes()}
+        self.set_inputs([inp + n for inp in self._inputs])
+        self.set_outputs([outp + n for outp in self._outputs])
+
+        # every node is rewritten, hence privatized, but not handed out
+        nodes = [self._own(identity) for identity in list(self._nodes)]
+        for m in nodes:
+            m.set_id(m.get_id() + n)
+            m.set_parents({key + n : value for key, value in m.get_parents().items()})
+            m.set_children({key + n : value for key, value in m.get_children().items()})
+
+        self._nodes = {m.get_id():m for m in nodes}
+        self._cow = False
+        self._owned = set()
+        self._handed_out = {identity + n for identity in self._handed_out}
+        self._next_id += n
+        self._free_ids = []
+        self._touch()
     
 
     def merge_nodes(self, node_id1, node_id2):
@@ -324,10 +548,24 @@ class open_digraph(open_digraph_composition_mx, open_digraph_factory_mx, open_di
     
     def copy(self):
         '''
-        Creates a copy of the graph.
+        Creates a copy of the graph, copying only the nodes already handed out (get_node_by_id, get_nodes,
+        get_node_map, or given to the constructor), which keep belonging to this graph only.
+        The other nodes are shared between the two graphs until they are modified (copy on write): each graph copies
+        a node before its first modification, and before handing it out.
         
         Returns:
             open_digraph: A copy of the graph.
         '''
-        new_nodes = [node.copy() for node in self.get_nodes()]
-        return open_digraph(self._inputs, self._outputs, new_nodes)
+        nodes = [self._shared_node(identity) for identity in self._nodes]
+        g = open_digraph._from_nodes(list(self._inputs), list(self._outputs), nodes)
+        g._share(identity for identity in self._nodes if self._is_handed_out(identity))
+        self._share()
+        return g
+
+
+    def freeze(self):
+        '''
+        Returns an immutable, array-backed (compressed sparse row) snapshot of the graph, see frozen_digraph.
+        frozen_digraph.thaw converts it back
+        '''
+        return frozen_digraph.from_graph(self)
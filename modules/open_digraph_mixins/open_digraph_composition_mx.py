@@ -2,68 +2,128 @@
 Mixin for composition of open directed graphs
 '''
 
-class open_digraph_composition_mx:
-    def iparallel(self, g):
-            '''
-            g: open_digraph; graph to be composed in parallel with self
-            Modifies the current graph by composing it in parallel with the graph passed as a parameter
-            '''
-            g = g.copy()
-            if self.get_nodes() != [] and g.get_nodes() != []:
-                g.shift_indices(self.max_id() - g.min_id() + 1)
+from modules import node
+
+def _shifted_nodes(g, offset, consume):
+    '''
+    g: open_digraph; graph whose nodes are shifted
+    offset: int; number by which to translate the ids
+    consume: bool; if True, the nodes of g are updated in place, otherwise shifted copies are made
+    Returns the nodes of g with their ids (and those of their parents and children) shifted, in a single pass
+    '''
+    nodes = g.get_nodes() if consume else list(g._nodes.values()) # only consumed nodes need to be private
+    if consume and offset == 0:
+        return nodes
+    shifted = []
+    for n in nodes:
+        parents = {key + offset: value for key, value in n.get_parents().items()}
+        children = {key + offset: value for key, value in n.get_children().items()}
+        if consume:
+            n.set_id(n.get_id() + offset)
+            n.set_parents(parents)
+            n.set_children(children)
+            shifted.append(n)
+        else:
+            shifted.append(node.node(n.get_id() + offset, n.get_label(), parents, children))
+    return shifted
+
 
-            self._inputs.extend(g.get_input_ids())
-            self._outputs.extend(g.get_output_ids())
+def _release(g):
+    '''
+    Empties a graph whose nodes were moved into another one
+    '''
+    g.set_inputs([])
+    g.set_outputs([])
+    g._nodes = {}
+    g._init_id_allocator(g._reuse_ids)
+    g._touch()
 
-            for id, node in g.get_node_map().items():
-                self._nodes[id] = node
+
+class open_digraph_composition_mx:
+    def iparallel(self, g, consume=False):
+        '''
+        g: open_digraph; graph to be composed in parallel with self
+        consume: bool; if True, the nodes of g are moved into self instead of being copied, leaving g empty
+        Modifies the current graph by composing it in parallel with the graph passed as a parameter.
+        The ids of g are shifted past those of self (see id_bound) in a single pass, in O(size of g)
+        '''
+        if consume and g is self:
+            raise ValueError("A graph cannot be composed with itself when consumed")
+        offset = self.id_bound() - g.min_id() if self._nodes and g._nodes else 0
+        inputs = [input_id + offset for input_id in g.get_input_ids()]
+        outputs = [output_id + offset for output_id in g.get_output_ids()]
+        nodes = _shifted_nodes(g, offset, consume)
+        if consume:
+            _release(g)
+
+        self._inputs.extend(inputs)
+        self._input_set.update(inputs)
+        self._outputs.extend(outputs)
+        self._output_set.update(outputs)
+        for n in nodes:
+            self._insert(n)
+        self._touch()
 
     @classmethod
-    def parallel(cls, g1, g2):
+    def parallel(cls, g1, g2, consume=False):
         '''
         g1: open_digraph; first graph of composition
         g2: open_digraph; second graph of composition
+        consume: bool; if True, g1 becomes the composition and the nodes of g2 are moved into it (see iparallel)
         Returns the parallel composition of the parameter graphs
         Note that the operation is not strictly commutative, but will return isomorphic graphs
         '''
-        composition = g1.copy()
-        composition.iparallel(g2)
+        composition = g1 if consume else g1.copy()
+        composition.iparallel(g2, consume)
         return composition
     
     
-    def icompose(self, f):
+    def icompose(self, f, consume=False):
         '''
         f: open_digraph; graph to be composed sequentially with self
-        Modifies the current graph by composing it (if possible) in sequence with the graph passed as a parameter
+        consume: bool; if True, the nodes of f are moved into self instead of being copied, leaving f empty
+        Modifies the current graph by composing it (if possible) in sequence with the graph passed as a parameter.
+        The ids of the smaller graph are shifted past those of the other one (see id_bound) in a single pass,
+        in O(size of the smaller graph); the ids of the larger one are kept
         '''
         if len(self.get_input_ids()) != len(f.get_output_ids()):
             raise ValueError("Number of inputs of the first graph does not match the number of outputs of the second graph.")
-        
-        f = f.copy()
+        if consume and f is self:
+            raise ValueError("A graph cannot be composed with itself when consumed")
 
-        if self.get_nodes() != [] and f.get_nodes() != []:
-            self.shift_indices(f.max_id() - self.min_id() + 1)
-        
-        for id, node in f.get_node_map().items():
-            self._nodes[id] = node.copy()
+        offset = 0
+        if self._nodes and f._nodes and len(f._nodes) <= len(self._nodes):
+            offset = self.id_bound() - f.min_id()
+        f_inputs = [input_id + offset for input_id in f.get_input_ids()]
+        f_outputs = [output_id + offset for output_id in f.get_output_ids()]
+        nodes = _shifted_nodes(f, offset, consume)
+        if consume:
+            _release(f)
 
+        if self._nodes and nodes and len(nodes) > len(self._nodes):
+            self.shift_indices(max(n.get_id() for n in nodes) - self.min_id() + 1)
+        
+        for n in nodes:
+            self._insert(n)
+        self._touch()
 
         prev_inputs = self.get_input_ids()
-        self._inputs = f.get_input_ids()
-        for input_id, output_id in zip(prev_inputs, f.get_output_ids()):
+        self.set_inputs(f_inputs)
+        for input_id, output_id in zip(prev_inputs, f_outputs):
             self.add_edge(output_id, input_id)
 
 
     @classmethod
-    def compose(cls, g1, g2):
+    def compose(cls, g1, g2, consume=False):
         '''
         g1: open_digraph; first graph of composition
         g2: open_digraph; second graph of composition
+        consume: bool; if True, g1 becomes the composition and the nodes of g2 are moved into it (see icompose)
         Returns the composition of the parameter graphs
         Note that the operation is not strictly commutative
         '''
-        g1 = g1.copy()
-        g1.icompose(g2)
+        g1 = g1 if consume else g1.copy()
+        g1.icompose(g2, consume)
         return g1
     
     @classmethod
@@ -2,8 +2,28 @@
 Factory mixin for open directed graphs
 '''
 
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from modules import node
 from modules.open_digraph_mixins import adjacency_matrices
 
+def random_generator(seed=None):
+    '''
+    seed: int, random.Random or numpy Generator; source of randomness, a freshly seeded one if None
+    Returns a random.Random drawing from the given source (seeded from it if it is a numpy Generator)
+    '''
+    if isinstance(seed, random.Random):
+        return seed
+    if hasattr(seed, 'integers'):
+        return random.Random(int(seed.integers(2**63)))
+    return random.Random(seed)
+
+
 class open_digraph_factory_mx:
     @classmethod
     def empty(cls):
@@ -41,13 +61,100 @@ class open_digraph_factory_mx:
         else:
             raise ValueError(f"Invalid value {form} for form parameter.")
 
-        g = cls.empty()
-        for i in range(n):
-            g.add_node(label=f"{i}")
-        
-        for i in range(n):
-            for j in range(n):
-                for k in range(M[i][j]):
-                    g.add_edge(i, j)
+        return cls.from_adjacency_matrix(M, [], [], labels=[f"{i}" for i in range(n)])
+
+
+    @classmethod
+    def random_dag(cls, n, fan_in=2, seed=None):
+        '''
+        n: int; Number of nodes
+        fan_in: int or function; number of parents of each node (capped by the number of preceding nodes),
+            or function drawing it from the random generator, e.g. lambda rng: rng.randint(1, 3)
+        seed: int, random.Random or numpy Generator; source of randomness (see random_generator)
+        Generates a sparse random directed acyclic graph in O(V+E), without ports: node i draws its parents,
+        without repetition, among nodes 0 to i-1 (ids are thus a topological order).
+        The expected number of edges is about n times the expected fan-in
+        '''
+        rng = random_generator(seed)
+        edges = []
+        for i in range(1, n):
+            k = min(fan_in(rng) if callable(fan_in) else fan_in, i)
+            edges.extend((parent, i) for parent in rng.sample(range(i), k))
+        return cls.from_edges(n, edges, [f"{i}" for i in range(n)], [], [], validate=False)
+
+
+    @classmethod
+    def from_adjacency_matrix(cls, M, inputs, outputs, labels=None, ids=None):
+        '''
+        M: int matrix; M[i][j] is the multiplicity of the edge from node i to node j. Nested lists, a square NumPy
+            array or a (data, indices, indptr) CSR tuple, as returned by adjacency_matrix
+        inputs: int list; the ids of the input nodes
+        outputs: int list; the ids of the output nodes
+        labels: str list; label of the node of each row, '' if None
+        ids: int list; id of the node of each row, the index of the row if None
+        Builds the graph in bulk, without checking edges one at a time: in O(V+nnz) from a CSR matrix
+        (dense matrices are scanned once)
+        '''
+        if isinstance(M, tuple):
+            data, indices, indptr = M
+            n = len(indptr) - 1
+            entries = ((i, indices[k], data[k]) for i in range(n) for k in range(indptr[i], indptr[i + 1]))
+        else:
+            n = len(M)
+            if any(len(row) != n for row in M):
+                raise ValueError("The adjacency matrix must be square")
+            if np is not None and isinstance(M, np.ndarray):
+                rows, columns = np.nonzero(M)
+                entries = zip(rows.tolist(), columns.tolist(), M[rows, columns].tolist())
+            else:
+                entries = ((i, j, m) for i, row in enumerate(M) for j, m in enumerate(row) if m)
+
+        ids = list(range(n)) if ids is None else list(ids)
+        labels = [''] * n if labels is None else list(labels)
+        if len(ids) != n or len(labels) != n:
+            raise ValueError("There must be one id and one label per row of the adjacency matrix")
+
+        parents = [{} for _ in range(n)]
+        children = [{} for _ in range(n)]
+        for i, j, m in entries:
+            if m < 0:
+                raise ValueError("Multiplicities must be non-negative")
+            if m:
+                children[i][ids[j]] = children[i].get(ids[j], 0) + int(m)
+                parents[j][ids[i]] = parents[j].get(ids[i], 0) + int(m)
+
+        return cls._from_nodes(list(inputs), list(outputs),
+                               [node.node(ids[i], labels[i], parents[i], children[i]) for i in range(n)])
+
+
+    @classmethod
+    def from_edges(cls, n_nodes, edges, labels, inputs, outputs, validate=True):
+        '''
+        n_nodes: int; number of nodes, whose ids are 0 to n_nodes - 1
+        edges: (int, int) iter; (source, target) pairs, a pair repeated m times giving an edge of multiplicity m
+        labels: str list; label of each node, '' if None
+        inputs: int list; the ids of the input nodes
+        outputs: int list; the ids of the output nodes
+        validate: bool; if True, checks once the graph is built that it is well-formed (see is_well_formed)
+        Builds the graph in bulk, in O(V+E): the nodes are allocated at once and their parent and child maps
+        filled in a single pass over the edges, without checking edges one at a time
+        '''
+        labels = [''] * n_nodes if labels is None else list(labels)
+        if len(labels) != n_nodes:
+            raise ValueError("There must be one label per node")
+
+        parents = [{} for _ in range(n_nodes)]
+        children = [{} for _ in range(n_nodes)]
+        for src, tgt in edges:
+            if validate and not (0 <= src < n_nodes and 0 <= tgt < n_nodes):
+                raise ValueError(f"The edge ({src}, {tgt}) joins nodes which are not part of the graph")
+            src_children = children[src]
+            src_children[tgt] = src_children.get(tgt, 0) + 1
+            tgt_parents = parents[tgt]
+            tgt_parents[src] = tgt_parents.get(src, 0) + 1
 
+        g = cls._from_nodes(list(inputs), list(outputs),
+                            [node.node(i, labels[i], parents[i], children[i]) for i in range(n_nodes)])
+        if validate and not g.is_well_formed():
+            raise ValueError("The graph is not well-formed")
         return g
@@ -2,111 +2,311 @@
 Mixin for open directed graphs containing methods concerning paths between different nodes
 '''
 
+import heapq
+from collections import deque
+
+from modules.reachability_index import reachability_index
+
 class open_digraph_paths_mx:
-    def separate_connected_components(self):
+    def connected_components(self):
         '''
-        Separates the circuit into its connected components.
-        Returns a list of open_digraph objects representing the connected components.
+        Labels the (weakly) connected components of the graph with an iterative breadth-first search, in O(V+E).
+        Returns the list of the sets of node ids of the components, ordered by smallest id
         '''
-        connected_components = []
+        components = []
         visited = set()
+        for node_id in sorted(self._nodes):
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+            component = {node_id}
+            queue = deque([node_id])
+            while queue:
+                n = self._nodes[queue.popleft()]
+                for neighbour_id in list(n.get_children()) + list(n.get_parents()):
+                    if neighbour_id not in visited:
+                        visited.add(neighbour_id)
+                        component.add(neighbour_id)
+                        queue.append(neighbour_id)
+            components.append(component)
+        return components
+
+
+    def separate_connected_components(self, views=False):
+        '''
+        views: bool; if True, the components are views sharing their node objects with the graph,
+            otherwise they share them copy on write (see copy)
+        Separates the circuit into its connected components, in O(V+E).
+        Each component keeps the original node ids, and the inputs and outputs of the graph it contains, in port order.
+        Views must be treated as read-only (mutating them would bypass the graph they belong to).
+        Returns a list of graphs (of the class of the graph) representing the connected components.
+        '''
+        components_graphs = []
+        for component in self.connected_components():
+            if views:
+                nodes = [self._nodes[node_id] for node_id in sorted(component)]
+            else:
+                nodes = [self._shared_node(node_id) for node_id in sorted(component)]
+            g = self._from_nodes([node_id for node_id in self.get_input_ids() if node_id in component],
+                                 [node_id for node_id in self.get_output_ids() if node_id in component],
+                                 nodes)
+            if not views:
+                g._share(node_id for node_id in component if self._is_handed_out(node_id))
+            components_graphs.append(g)
+        if not views:
+            self._share()
+        return components_graphs
+
+
+    def strongly_connected_components(self):
+        '''
+        Tarjan's algorithm, iterative so that long paths do not hit the recursion limit.
+        Returns the list of the strongly connected components (sets of node ids), in reverse topological order
+        '''
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        components = []
+
+        for root in self.get_node_ids():
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            call_stack = [(root, iter(self._nodes[root].get_children()))]
+
+            while call_stack:
+                node_id, children = call_stack[-1]
+                for child_id in children:
+                    if child_id not in index:
+                        index[child_id] = low[child_id] = len(index)
+                        stack.append(child_id)
+                        on_stack.add(child_id)
+                        call_stack.append((child_id, iter(self._nodes[child_id].get_children())))
+                        break
+                    if child_id in on_stack:
+                        low[node_id] = min(low[node_id], index[child_id])
+                else:
+                    call_stack.pop()
+                    if call_stack:
+                        parent_id = call_stack[-1][0]
+                        low[parent_id] = min(low[parent_id], low[node_id])
+                    if low[node_id] == index[node_id]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == node_id:
+                                break
+                        components.append(component)
+
+        return components
+
+
+    def find_cycle(self):
+        '''
+        Returns a cycle of the graph as a list of node ids [v0, v1, ..., vk, v0], each node being a parent of the
+        next one, or None if the graph is acyclic
+        '''
+        for component in self.strongly_connected_components():
+            start = next(iter(component))
+            if len(component) == 1 and start not in self._nodes[start].get_children():
+                continue
 
-        def dfs(node_id, component):
-            if node_id not in visited:
-                visited.add(node_id)
-                component.append(node_id)
+            # Breadth-first search inside the component, back to the starting node
+            prev = {}
+            queue = deque([start])
+            while queue:
+                node_id = queue.popleft()
                 for child_id in self._nodes[node_id].get_children():
-                    dfs(child_id, component)
-                for parent_id in self._nodes[node_id].get_parents():
-                    dfs(parent_id, component)
+                    if child_id == start:
+                        cycle = [start, node_id]
+                        while node_id != start:
+                            node_id = prev[node_id]
+                            cycle.append(node_id)
+                        return cycle[::-1]
+                    if child_id in component and child_id not in prev:
+                        prev[child_id] = node_id
+                        queue.append(child_id)
 
-        for node_id in self.get_node_ids():
-            if node_id not in visited:
-                component = []
-                dfs(node_id, component)
-                connected_components.append(component)
+        return None
 
-        components_graphs = []
-        for component in connected_components:
-            component_graph = self.__class__.empty()
-            for node_id in component:
-                node = self.get_node_by_id(node_id)
-                component_graph.add_node(label=node.get_label(), parents=node.get_parents(), children=node.get_children())
-            components_graphs.append(component_graph)
 
-        return components_graphs
+    def _neighbours(self, node_id, direction):
+        n = self._nodes[node_id]
+        if direction == 1:
+            return n.get_children()
+        if direction == -1:
+            return n.get_parents()
+        return list(n.get_children()) + list(n.get_parents())
 
 
-    def dijkstra(self, src, direction=None):
-        def get_neighbours(n):
-            if direction == None:
-                return list(n.get_children().keys()) + list(n.get_parents().keys())
-            if direction == -1:
-                return list(n.get_parents().keys())
-            if direction == 1:
-                return list(n.get_children().keys())
-
-        Q = [src]
-        dist = {src: 0}
+    def bfs(self, src, direction=None):
+        '''
+        src: int; id of the source node
+        direction: int; None to follow edges both ways, 1 for children only, -1 for parents only
+        Breadth-first search in O(V+E). Returns the dicts mapping the id of each reached node
+        to its distance from src and to the id of its predecessor on a shortest path
+        '''
+        return self.shortest_paths([src], direction)
+
+
+    def shortest_paths(self, sources, direction=None, weight=None):
+        '''
+        sources: int iter; ids of the source nodes
+        direction: int; None to follow edges both ways, 1 for children only, -1 for parents only
+        weight: function; (parent id, child id) -> non-negative number, weight of the edges, every edge weighing 1 if None
+        Computes in a single sweep the distance of every node to the nearest source (with breadth-first search,
+        or Dijkstra's algorithm on a binary heap if weight is given).
+        Returns the dicts mapping the id of each reached node to its distance and to the id of its predecessor
+        '''
+        dist = {}
+        for src in sources:
+            if src not in self._nodes:
+                raise ValueError(f"Node {src} is not part of the graph")
+            dist[src] = 0
         prev = {}
-        while Q != []:
-            u = min(Q, key = lambda q: dist[q])
-            Q.remove(u)
-            neighbours = self.get_nodes_by_ids(get_neighbours(u))
-            for n in neighbours:
-                if n not in dist:
-                    Q.append(n)
-                if n not in dist or dist[n] > dist[u] + 1:
-                    dist[n] = dist[u] + 1
-                    prev[n] = u
+
+        if weight is None:
+            queue = deque(dist)
+            while queue:
+                u = queue.popleft()
+                d = dist[u] + 1
+                for v in self._neighbours(u, direction):
+                    if v not in dist:
+                        dist[v] = d
+                        prev[v] = u
+                        queue.append(v)
+            return dist, prev
+
+        heap = [(0, src) for src in dist]
+        done = set()
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            n = self._nodes[u]
+            edges = []
+            if direction != -1:
+                edges.extend((v, u, v) for v in n.get_children())
+            if direction != 1:
+                edges.extend((v, v, u) for v in n.get_parents())
+            for v, parent_id, child_id in edges:
+                w = weight(parent_id, child_id)
+                if w < 0:
+                    raise ValueError("Edge weights must be non-negative")
+                if v not in dist or d + w < dist[v]:
+                    dist[v] = d + w
+                    prev[v] = u
+                    heapq.heappush(heap, (d + w, v))
         return dist, prev
+
+
+    def distances_from_inputs(self, direction=1, weight=None):
+        '''
+        Returns the dict mapping the id of each node reachable from an input to its distance from the nearest input
+        (see shortest_paths)
+        '''
+        return self.shortest_paths(self.get_input_ids(), direction, weight)[0]
+
+
+    def distances_to_outputs(self, weight=None):
+        '''
+        Returns the dict mapping the id of each node reaching an output to its distance to the nearest output
+        (see shortest_paths)
+        '''
+        return self.shortest_paths(self.get_output_ids(), -1, weight)[0]
+
+
+    def dijkstra(self, src, direction=None):
+        '''
+        src: node; source node
+        direction: int; None to follow edges both ways, 1 for children only, -1 for parents only
+        Returns the dicts mapping each reached node to its distance from src and to its predecessor (see bfs for ids)
+        '''
+        dist, prev = self.bfs(src.get_id(), direction)
+        return ({self._nodes[node_id]: d for node_id, d in dist.items()},
+                {self._nodes[node_id]: self._nodes[prev_id] for node_id, prev_id in prev.items()})
     
     
     def common_ancestors(self, n1, n2):
-        anc1 = self.dijkstra(n1, direction=-1)[0]
-        anc2 = self.dijkstra(n2, direction=-1)[0]
+        anc1 = self.bfs(n1.get_id(), direction=-1)[0]
+        anc2 = self.bfs(n2.get_id(), direction=-1)[0]
         res = {}
         for key in anc1:
             if key in anc2:
-                res[key] = (anc1[key], anc2[key])
+                res[self._nodes[key]] = (anc1[key], anc2[key])
         return res
     
 
-    def topological_sort(self):
+    def reachability(self):
         '''
-        Returns the topological sort of the (acyclic) graph, as a list of sets of node numbers
+        Returns the reachability_index (transitive closure) of the acyclic graph, answering ancestor, descendant,
+        common ancestor, support and fan-out cone queries without searching the graph.
+        The index is cached until the next mutation of the graph
         '''
-        copied_graph = self.copy()
-        top_sort = []
-        leaves = []
+        return self._cached('reachability', lambda: reachability_index(self))
 
-        copied_graph.remove_nodes_by_id(copied_graph.get_input_ids())
-        copied_graph.remove_nodes_by_id(copied_graph.get_output_ids())
 
-        while copied_graph.get_nodes() != []:
-            for n in copied_graph.get_nodes():
-                if n.get_parents() == {}:
-                    leaves.append(n.get_id())
+    def _kahn_levels(self):
+        '''
+        Kahn's algorithm, in O(V+E) and without copying the graph, inputs and outputs being left out
+        '''
+        ports = set(self.get_input_ids()) | set(self.get_output_ids())
+        indegree = {}
+        for node_id, n in self._nodes.items():
+            if node_id not in ports:
+                indegree[node_id] = sum(m for parent_id, m in n.get_parents().items() if parent_id not in ports)
 
-            top_sort.append(set(leaves))
-            copied_graph.remove_nodes_by_id(leaves)
-            leaves = []
+        level = [node_id for node_id, d in indegree.items() if d == 0]
+        top_sort = []
+        while level:
+            top_sort.append(set(level))
+            next_level = []
+            for node_id in level:
+                for child_id, m in self._nodes[node_id].get_children().items():
+                    if child_id in ports:
+                        continue
+                    indegree[child_id] -= m
+                    if indegree[child_id] == 0:
+                        next_level.append(child_id)
+            level = next_level
 
+        if sum(len(level) for level in top_sort) != len(indegree):
+            raise ValueError("The graph is cyclic")
         return top_sort
 
 
+    def topological_sort(self):
+        '''
+        Returns the topological sort of the (acyclic) graph, as a list of sets of node numbers.
+        The result is cached until the next mutation of the graph and must not be modified
+        '''
+        return self._cached('topological_sort', self._kahn_levels)
+
+
+    def node_depths(self):
+        '''
+        Returns the dict mapping each node of the topological sort to its depth (cached, see topological_sort)
+        '''
+        return self._cached('node_depths', lambda: {node_id: i + 1 for i, level in enumerate(self.topological_sort())
+                                                    for node_id in level})
+
+
     def node_depth(self, n1):
         '''
         Calculates the depth of a given node in the (acyclic) graph
         n1: int; node whose depth is calculated
         Returns the depth of the node in the graph
         '''
-        top_sort = self.topological_sort()
-        for i in range(len(top_sort)):
-            if n1 in top_sort[i]:
-                return i + 1
-        
-        raise ValueError("Invalid node to calculate depth in graph")
+        depths = self.node_depths()
+        if n1 not in depths:
+            raise ValueError("Invalid node to calculate depth in graph")
+        return depths[n1]
     
 
     def graph_depth(self):
@@ -129,7 +329,7 @@ class open_digraph_paths_mx:
         prev = {}
         for i in range(k, self.graph_depth()):
             for w in top_sort[i]:
-                dist_parents = [parent for parent in self.get_node_by_id(w).get_parents() if parent in dist]
+                dist_parents = [parent for parent in self._nodes[w].get_parents() if parent in dist]
                 if dist_parents != []:
                     prev[w] = max(dist_parents, key=lambda p: dist[p])
                     dist[w] = dist[prev[w]] + 1
@@ -141,3 +341,62 @@ class open_digraph_paths_mx:
 
         raise ValueError("Impossible to calculate the distance between the given nodes")
     
+
+
+    def _timing_analysis(self):
+        order = list(self.get_input_ids()) + [node_id for level in self.topological_sort() for node_id in sorted(level)] \
+            + list(self.get_output_ids())
+
+        arrival = {}
+        critical_parent = {}
+        for node_id in order:
+            parents = self._nodes[node_id].get_parents()
+            if parents:
+                critical_parent[node_id] = max(parents, key=lambda p: arrival[p])
+                arrival[node_id] = 1 + arrival[critical_parent[node_id]]
+            else:
+                arrival[node_id] = 0
+
+        to_output = {}
+        for node_id in reversed(order):
+            children = self._nodes[node_id].get_children()
+            to_output[node_id] = 1 + max(to_output[c] for c in children) if children else 0
+
+        depth = max(arrival.values(), default=0)
+        required = {node_id: depth - to_output[node_id] for node_id in order}
+
+        return {
+            'depth': depth,
+            'arrival': arrival,
+            'required': required,
+            'slack': {node_id: required[node_id] - arrival[node_id] for node_id in order},
+            'critical_parent': critical_parent,
+        }
+
+
+    def critical_path_analysis(self):
+        '''
+        Computes, for every node of the (acyclic) graph at once, in O(V+E):
+        - arrival: the length of the longest path from a source (input or constant) to the node
+        - required: the latest arrival of the node which does not increase the depth of the graph
+        - slack: required - arrival, 0 for the nodes lying on a critical path
+        - depth: the length of the critical (longest) paths
+        - critical_parent: maps each non-source node to the parent its longest path comes through
+        Returns these as a dict. The result is cached until the next mutation of the graph and must not be modified
+        '''
+        return self._cached('critical_path_analysis', self._timing_analysis)
+
+
+    def critical_path(self, node_id):
+        '''
+        Rebuilds the longest path from a source to a node from critical_path_analysis, in O(length of the path)
+        node_id: int; id of the last node of the path (typically an output)
+        Returns the path as a list of ids, starting from a source
+        '''
+        if node_id not in self._nodes:
+            raise ValueError(f"Node {node_id} is not in the graph")
+        critical_parent = self.critical_path_analysis()['critical_parent']
+        path = [node_id]
+        while path[-1] in critical_parent:
+            path.append(critical_parent[path[-1]])
+        return path[::-1]
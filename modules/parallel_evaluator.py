@@ -0,0 +1,135 @@
+'''
+Multi-process batch evaluation of compiled boolean circuits, exchanging stimuli and results through shared memory
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+to_chars = bytes.maketrans(b'\x00\x01', b'01')
+from_chars = bytes.maketrans(b'01', b'\x00\x01')
+
+_worker_program = None
+
+
+def _init_worker(program):
+    '''
+    program: compiled_circuit; circuit evaluated by the worker
+    Ships the compiled circuit to a worker, once
+    '''
+    global _worker_program
+    _worker_program = program
+
+
+def _evaluate_slice(input_name, output_name, start, end):
+    '''
+    input_name: str; name of the shared stimulus buffer, one byte (0/1) per input and row
+    output_name: str; name of the shared result buffer, one byte (0/1) per output and row
+    start: int; first row of the slice
+    end: int; row following the last row of the slice
+    Evaluates rows start to end - 1 with bitsliced simulation, writing the results in place
+    '''
+    n_in = _worker_program.input_count()
+    n_out = _worker_program.output_count()
+    count = end - start
+    stimuli = shared_memory.SharedMemory(name=input_name)
+    results = shared_memory.SharedMemory(name=output_name)
+    try:
+        buf = stimuli.buf
+        words = [int(b'0' + bytes(buf[start * n_in + i:end * n_in:n_in]).translate(to_chars)[::-1], 2) for i in range(n_in)]
+        outputs = _worker_program.run_words(words, count)
+        buf = results.buf
+        for j, word in enumerate(outputs):
+            buf[start * n_out + j:end * n_out:n_out] = bin(word)[2:].zfill(count)[::-1].encode().translate(from_chars)
+        del buf
+    finally:
+        stimuli.close()
+        results.close()
+
+
+class parallel_evaluator:
+    '''
+    Process pool evaluating a compiled circuit on large batches of input vectors.
+    The compiled circuit is shipped to each worker once; stimuli and results live in shared memory buffers,
+    workers only receive the bounds of the slice they evaluate. Every row is computed by exactly one task,
+    so results do not depend on the number of workers.
+    '''
+
+
+    def __init__(self, program, workers=None, chunk_size=4096):
+        '''
+        program: compiled_circuit; circuit to evaluate
+        workers: int; number of worker processes, the number of CPUs if None
+        chunk_size: int; number of rows evaluated by each task (and packed in each word)
+        '''
+        if chunk_size <= 0:
+            raise ValueError("The chunk size must be positive")
+        self._program = program
+        self._chunk_size = chunk_size
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(program,))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        '''
+        Shuts the worker processes down
+        '''
+        self._pool.shutdown()
+
+
+    def evaluate(self, vectors):
+        '''
+        vectors: int list list or ndarray; N input vectors (one bit per input, in port order)
+        Returns the N output vectors, as an (N, n_outputs) uint8 array if vectors is an array, as lists otherwise
+        '''
+        n_in = self._program.input_count()
+        n_out = self._program.output_count()
+        rows = len(vectors)
+        if any(len(vector) != n_in for vector in vectors):
+            raise ValueError(f"Every vector must contain {n_in} bits")
+
+        # Shared memory blocks cannot be empty
+        stimuli = shared_memory.SharedMemory(create=True, size=max(rows * n_in, 1))
+        results = shared_memory.SharedMemory(create=True, size=max(rows * n_out, 1))
+        try:
+            if np is not None and isinstance(vectors, np.ndarray):
+                # checked before the uint8 cast, which would wrap 256 to 0
+                if not ((vectors == 0) | (vectors == 1)).all():
+                    raise ValueError("Vectors must only contain bits")
+                view = np.ndarray((rows, n_in), dtype=np.uint8, buffer=stimuli.buf)
+                view[:] = vectors
+                del view
+            else:
+                try:
+                    stimuli.buf[:rows * n_in] = bytes(int(bit) for vector in vectors for bit in vector)
+                except ValueError:
+                    raise ValueError("Vectors must only contain bits")
+            if bytes(stimuli.buf[:rows * n_in]).translate(None, b'\x00\x01'):
+                raise ValueError("Vectors must only contain bits")
+
+            tasks = [self._pool.submit(_evaluate_slice, stimuli.name, results.name, start, min(start + self._chunk_size, rows))
+                     for start in range(0, rows, self._chunk_size)]
+            for task in tasks:
+                task.result()
+
+            flat = bytes(results.buf[:rows * n_out])
+        finally:
+            stimuli.close()
+            stimuli.unlink()
+            results.close()
+            results.unlink()
+
+        if np is not None and isinstance(vectors, np.ndarray):
+            return np.frombuffer(flat, dtype=np.uint8).reshape((rows, n_out)).copy()
+        return [list(flat[k * n_out:(k + 1) * n_out]) for k in range(rows)]
@@ -0,0 +1,153 @@
+'''
+Transitive closure of directed acyclic graphs, answering reachability queries without searching the graph
+'''
+
+def _mask_ids(mask, ids):
+    '''
+    Returns the set of the ids of the bits set in mask
+    '''
+    res = set()
+    while mask:
+        low = mask & -mask
+        res.add(ids[low.bit_length() - 1])
+        mask ^= low
+    return res
+
+
+class reachability_index:
+    '''
+    Ancestors and descendants of every node of an acyclic open directed graph, stored as Python-int bitsets.
+    Node i (the i-th smallest id) is bit i. Both closures are built in O(V+E) bitset operations, following a
+    topological order of all the nodes (inputs and outputs included); a query then costs O(1) or O(V/64) word
+    operations, instead of a search of the graph.
+    The index is a snapshot: it is not updated when the graph changes.
+    '''
+
+
+    def __init__(self, g):
+        '''
+        g: open_digraph; acyclic graph to index
+        '''
+        node_map = g._nodes
+        self._ids = sorted(node_map)
+        self._index = {identity: i for i, identity in enumerate(self._ids)}
+
+        indegree = {identity: len(n.get_parents()) for identity, n in node_map.items()}
+        order = [identity for identity in self._ids if indegree[identity] == 0]
+        for identity in order:
+            for child_id in node_map[identity].get_children():
+                indegree[child_id] -= 1
+                if indegree[child_id] == 0:
+                    order.append(child_id)
+        if len(order) != len(self._ids):
+            raise ValueError("The graph is cyclic")
+
+        self._ancestors = [0] * len(self._ids)
+        for identity in order:
+            mask = 0
+            for parent_id in node_map[identity].get_parents():
+                i = self._index[parent_id]
+                mask |= self._ancestors[i] | (1 << i)
+            self._ancestors[self._index[identity]] = mask
+
+        self._descendants = [0] * len(self._ids)
+        for identity in reversed(order):
+            mask = 0
+            for child_id in node_map[identity].get_children():
+                i = self._index[child_id]
+                mask |= self._descendants[i] | (1 << i)
+            self._descendants[self._index[identity]] = mask
+
+        self._inputs = list(g.get_input_ids())
+        self._outputs = list(g.get_output_ids())
+        self._input_mask = 0
+        for identity in self._inputs:
+            self._input_mask |= 1 << self._index[identity]
+
+
+    def _position(self, identity):
+        if identity not in self._index:
+            raise ValueError(f"Node {identity} is not part of the graph")
+        return self._index[identity]
+
+
+    def ancestor_mask(self, identity):
+        '''
+        Returns the bitset of the (strict) ancestors of the node
+        '''
+        return self._ancestors[self._position(identity)]
+
+
+    def descendant_mask(self, identity):
+        '''
+        Returns the bitset of the (strict) descendants of the node
+        '''
+        return self._descendants[self._position(identity)]
+
+
+    def is_ancestor(self, a, b):
+        '''
+        a, b: int; ids of nodes of the graph
+        Returns True if there is a (non-empty) path from a to b
+        '''
+        return bool(self._ancestors[self._position(b)] >> self._position(a) & 1)
+
+
+    def is_descendant(self, a, b):
+        '''
+        a, b: int; ids of nodes of the graph
+        Returns True if there is a (non-empty) path from b to a
+        '''
+        return self.is_ancestor(b, a)
+
+
+    def ancestors(self, identity):
+        return _mask_ids(self.ancestor_mask(identity), self._ids)
+
+
+    def descendants(self, identity):
+        return _mask_ids(self.descendant_mask(identity), self._ids)
+
+
+    def common_ancestors(self, node_ids):
+        '''
+        node_ids: int iter; ids of nodes of the graph
+        Returns the set of the nodes which are ancestors of, or equal to, every given node
+        (as in open_digraph.common_ancestors)
+        '''
+        mask = -1
+        for identity in node_ids:
+            i = self._position(identity)
+            mask &= self._ancestors[i] | (1 << i)
+        return _mask_ids(mask, self._ids) if mask != -1 else set()
+
+
+    def support(self, identity):
+        '''
+        identity: int; id of a node of the graph (usually an output)
+        Returns the set of the inputs the node depends on
+        '''
+        return _mask_ids(self.ancestor_mask(identity) & self._input_mask, self._ids)
+
+
+    def supports(self):
+        '''
+        Returns the dict mapping each output to its support (see support)
+        '''
+        return {identity: self.support(identity) for identity in self._outputs}
+
+
+    def fanout_cone(self, identity):
+        '''
+        identity: int; id of a node of the graph
+        Returns the set of the nodes whose value depends on the node (its descendants)
+        '''
+        return self.descendants(identity)
+
+
+    def fanout_cones(self, node_ids=None):
+        '''
+        node_ids: int iter; ids of nodes of the graph, the inputs if None
+        Returns the dict mapping each given node to its fan-out cone
+        '''
+        return {identity: self.fanout_cone(identity) for identity in (self._inputs if node_ids is None else node_ids)}
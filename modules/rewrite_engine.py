@@ -0,0 +1,62 @@
+'''
+Worklist-driven graph rewriting
+'''
+
+from collections import deque
+
+class rewrite_engine:
+    '''
+    Applies rewrite rules to a graph until none of them applies anymore.
+    A rule is a (pattern, action) pair of functions taking the graph and a node id: pattern returns True if the
+    rule applies at the node, action rewrites the graph and returns the ids of the nodes whose neighbourhood changed.
+    Only those nodes (and the rewritten node) are examined again, instead of rescanning the whole graph.
+    '''
+
+
+    def __init__(self, rules=None):
+        '''
+        rules: (function, function) list; rules tried in order at each node
+        '''
+        self._rules = list(rules) if rules is not None else []
+
+
+    def get_rules(self):
+        return self._rules
+
+
+    def register(self, pattern, action):
+        '''
+        pattern: function; (graph, node id) -> bool, True if the rule applies at the node
+        action: function; (graph, node id) -> int iter, rewrites the graph and returns the ids of the affected nodes
+        Adds a rule, tried after the already registered ones
+        '''
+        self._rules.append((pattern, action))
+
+
+    def run(self, g, node_ids=None):
+        '''
+        g: open_digraph; graph to rewrite in place
+        node_ids: int iter; nodes initially in the worklist, every node if None
+        Rewrites the graph until no rule applies. Returns the number of rewrites performed
+        '''
+        node_map = g._nodes # membership tests only, see open_digraph.copy
+        worklist = deque(g.get_node_ids() if node_ids is None else node_ids)
+        queued = set(worklist)
+        rewrites = 0
+        while worklist:
+            node_id = worklist.popleft()
+            queued.discard(node_id)
+            if node_id not in node_map:
+                continue
+
+            for pattern, action in self._rules:
+                if pattern(g, node_id):
+                    affected = list(action(g, node_id))
+                    rewrites += 1
+                    for affected_id in affected + [node_id]:
+                        if affected_id in node_map and affected_id not in queued:
+                            queued.add(affected_id)
+                            worklist.append(affected_id)
+                    break
+
+        return rewrites
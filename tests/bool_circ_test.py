@@ -66,12 +66,22 @@ def test_half_adder(self):
 
 if __name__ == '__main__':
     unittest.main()
+import random
 import unittest
 
 import sys
 sys.path.insert(0, '..')
 
 from modules.bool_circ import *
+from modules.compiled_circuit import *
+from modules.hierarchical_circuit import *
+from modules.parallel_evaluator import *
+from modules.rewrite_engine import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class TestBoolCirc(unittest.TestCase):
 
@@ -102,5 +112,728 @@ class TestBoolCirc(unittest.TestCase):
         expected_output_values = ['0', '1', '1', '1', '0']
         self.assertEqual(output_values, expected_output_values)
 
+
+class CompileTest(unittest.TestCase):
+    '''
+    Tests for the compiled (non-destructive) evaluation of boolean circuits
+    '''
+    def test_full_adder(self):
+        adder = bool_circ.adder(0)
+        program = adder.compile()
+        for a in range(2):
+            for b in range(2):
+                for c in range(2):
+                    carry, s = program.run([a, b, c])
+                    self.assertEqual(2 * carry + s, a + b + c)
+
+    def test_graph_not_modified(self):
+        adder = bool_circ.adder(0)
+        labels = {n.get_id(): n.get_label() for n in adder.get_nodes()}
+        adder.compile().run(['1', '1', '0'])
+        self.assertEqual({n.get_id(): n.get_label() for n in adder.get_nodes()}, labels)
+
+    def test_gates(self):
+        g = bool_circ()
+        i0 = g.add_node('')
+        i1 = g.add_node('')
+        g.set_inputs([i0, i1])
+        c0 = g.add_node(' ', parents={i0:1})
+        c1 = g.add_node(' ', parents={i1:1})
+        gates = [g.add_node(label, parents={c0:1, c1:1}) for label in ['&', '|', '^']]
+        gates.append(g.add_node('~', parents={c0:1}))
+        gates.append(g.add_node('1'))
+        g.set_outputs([g.add_node('', parents={gate:1}) for gate in gates])
+        program = g.compile()
+        self.assertEqual(program.run([0, 1]), [0, 1, 1, 1, 1])
+        self.assertEqual(program.run([1, 1]), [1, 1, 0, 0, 1])
+        values = program.run_slots([1, 0])
+        self.assertEqual([values[program.get_slot(gate)] for gate in gates], [0, 1, 1, 0, 1])
+        with self.assertRaises(ValueError):
+            program.run_slots([1, 2])
+
+    def test_invalid_circuits(self):
+        g = bool_circ()
+        a = g.add_node('&')
+        b = g.add_node('|', parents={a:1})
+        g.add_edge(b, a)
+        with self.assertRaises(ValueError):
+            g.compile()
+
+        g = bool_circ()
+        g.add_node('invalid')
+        with self.assertRaises(ValueError):
+            g.compile()
+
+        with self.assertRaises(ValueError):
+            bool_circ.adder(0).compile().run([0, 1])
+
+
+class BitslicedSimulationTest(unittest.TestCase):
+    '''
+    Tests for the bit-parallel simulation of boolean circuits
+    '''
+    def setUp(self):
+        self.adder = bool_circ.adder(1)
+        self.vectors = [[(k >> i) & 1 for i in range(5)] for k in range(32)]
+
+    def test_pack_unpack(self):
+        words = pack_vectors([[1, 0], [1, 1], [0, 1]], 2)
+        self.assertEqual(words, [0b011, 0b110])
+        self.assertEqual(unpack_words(words, 3), [[1, 0], [1, 1], [0, 1]])
+        self.assertEqual(unpack_words([], 0), [])
+
+    def test_simulate_matches_run(self):
+        program = self.adder.compile()
+        expected = [program.run(vector) for vector in self.vectors]
+        self.assertEqual(self.adder.simulate(self.vectors), expected)
+        self.assertEqual(self.adder.simulate(self.vectors, word_size=7), expected)
+
+    def test_run_words(self):
+        program = bool_circ.adder(0).compile()
+        # The 8 assignments of (a, b, c), pattern k holding bit i of k on input i
+        carry, s = program.run_words([0b10101010, 0b11001100, 0b11110000], 8)
+        self.assertEqual(carry, 0b11101000)
+        self.assertEqual(s, 0b10010110)
+
+    def test_invalid_vectors(self):
+        with self.assertRaises(ValueError):
+            self.adder.simulate([[0, 1]])
+        with self.assertRaises(ValueError):
+            self.adder.simulate([[0, 1, 2, 0, 0]])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class BatchEvaluationTest(unittest.TestCase):
+    '''
+    Tests for the vectorized (NumPy) evaluation of boolean circuits
+    '''
+    def setUp(self):
+        self.adder = bool_circ.adder(1)
+        self.vectors = [[(k >> i) & 1 for i in range(5)] for k in range(32)]
+        self.expected = self.adder.simulate(self.vectors)
+
+    def test_bits(self):
+        result = self.adder.evaluate_batch(np.array(self.vectors, dtype=np.uint8))
+        self.assertEqual(result.dtype, np.uint8)
+        self.assertEqual(result.tolist(), self.expected)
+
+    def test_bool(self):
+        result = self.adder.evaluate_batch(np.array(self.vectors, dtype=bool))
+        self.assertEqual(result.dtype, np.bool_)
+        self.assertEqual(result.astype(int).tolist(), self.expected)
+
+    def test_packed(self):
+        words = pack_vectors(self.vectors, 5)
+        X = np.array([words, [~w & (2**64 - 1) for w in words]], dtype=np.uint64)
+        result = self.adder.evaluate_batch(X)
+        self.assertEqual(result.shape, (2, 3))
+        self.assertEqual(unpack_words([int(w) for w in result[0]], 32), self.expected)
+        complement = [[1 - bit for bit in vector] for vector in self.vectors]
+        self.assertEqual(unpack_words([int(w) for w in result[1]], 32), self.adder.simulate(complement))
+
+    def test_invalid_shape(self):
+        with self.assertRaises(ValueError):
+            self.adder.evaluate_batch(np.zeros((4, 3), dtype=np.uint8))
+
+
+class TruthTableTest(unittest.TestCase):
+    '''
+    Tests for the exhaustive (chunked) truth table generation
+    '''
+    def setUp(self):
+        self.adder = bool_circ.adder(1)
+        self.expected = self.adder.simulate([[(k >> i) & 1 for i in range(5)] for k in range(32)])
+
+    def _unpack(self, chunks):
+        rows = []
+        for position, count, words in chunks:
+            self.assertEqual(position, len(rows))
+            rows.extend(unpack_words(words, count))
+        return rows
+
+    def test_single_chunk(self):
+        self.assertEqual(self._unpack(self.adder.truth_table()), self.expected)
+
+    def test_chunks(self):
+        chunks = list(self.adder.truth_table(chunk_bits=2))
+        self.assertEqual(len(chunks), 8)
+        self.assertEqual(self._unpack(chunks), self.expected)
+
+    def test_resume(self):
+        table = self.adder.truth_table(chunk_bits=3)
+        position, count, words = next(table)
+        next(table)
+        resumed = list(self.adder.truth_table(chunk_bits=3, start=position + 2 * count))
+        self.assertEqual(resumed[0][0], 16)
+        self.assertEqual(len(resumed), 2)
+        self.assertEqual(self._unpack(list(self.adder.truth_table(chunk_bits=3))[:2] + resumed), self.expected)
+
+    def test_invalid_start(self):
+        with self.assertRaises(ValueError):
+            next(self.adder.truth_table(chunk_bits=3, start=3))
+
+
+class IncrementalSimulationTest(unittest.TestCase):
+    '''
+    Tests for the incremental re-evaluation of boolean circuits
+    '''
+    def setUp(self):
+        self.adder = bool_circ.adder(1)
+        self.program = self.adder.compile()
+
+    def test_initial_values(self):
+        sim = self.adder.simulator([1, 0, 1, 1, 0])
+        self.assertEqual(sim.get_outputs(), self.program.run([1, 0, 1, 1, 0]))
+        self.assertEqual(sim.get_inputs(), [1, 0, 1, 1, 0])
+
+    def test_set_inputs(self):
+        sim = self.adder.simulator()
+        inputs = [0] * 5
+        for i in [0, 3, 1, 3, 4, 2, 0]:
+            inputs[i] = 1 - inputs[i]
+            sim.set_inputs({self.adder.get_input_ids()[i]: inputs[i]})
+            self.assertEqual(sim.get_outputs(), self.program.run(inputs))
+            for identity in self.adder.get_output_ids():
+                self.assertEqual(sim.get_value(identity), sim.get_outputs()[self.adder.get_output_ids().index(identity)])
+
+    def test_propagation_stops(self):
+        adder = bool_circ.adder(0)
+        sim = adder.simulator()
+        a, b, c = adder.get_input_ids()
+        self.assertEqual(sim.set_inputs({a: 0}), 0)
+        # With b = 0, the AND gate of a and b keeps its value: the carry is not re-evaluated
+        evaluated = sim.set_inputs({a: 1})
+        self.assertLess(evaluated, len(adder.compile().get_program()))
+
+    def test_invalid_inputs(self):
+        sim = self.adder.simulator()
+        with self.assertRaises(ValueError):
+            sim.set_inputs({self.adder.get_output_ids()[0]: 1})
+        with self.assertRaises(ValueError):
+            sim.set_inputs({self.adder.get_input_ids()[0]: 2})
+
+
+class ParallelEvaluationTest(unittest.TestCase):
+    '''
+    Tests for the multi-process evaluation of boolean circuits
+    '''
+    def setUp(self):
+        self.adder = bool_circ.adder(1)
+        self.vectors = [[(k >> i) & 1 for i in range(5)] for k in range(32)]
+        self.expected = self.adder.simulate(self.vectors)
+
+    def test_lists(self):
+        self.assertEqual(self.adder.evaluate_parallel(self.vectors, workers=2, chunk_size=5), self.expected)
+
+    def test_deterministic(self):
+        with parallel_evaluator(self.adder.compile(), workers=3, chunk_size=3) as evaluator:
+            self.assertEqual(evaluator.evaluate(self.vectors), self.expected)
+            self.assertEqual(evaluator.evaluate(self.vectors[::-1]), self.expected[::-1])
+            self.assertEqual(evaluator.evaluate([]), [])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_array(self):
+        result = self.adder.evaluate_parallel(np.array(self.vectors, dtype=np.uint8), workers=1)
+        self.assertEqual(result.tolist(), self.expected)
+
+    def test_invalid_vectors(self):
+        with self.assertRaises(ValueError):
+            self.adder.evaluate_parallel([[0, 1, 2, 0, 0]], workers=1)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_invalid_array(self):
+        for value in (2, 256, -1):
+            with self.assertRaises(ValueError):
+                self.adder.evaluate_parallel(np.array([[0, 1, value, 0, 0]]), workers=1)
+
+
+class RewriteTest(unittest.TestCase):
+    '''
+    Tests for the worklist-driven evaluation of boolean circuits by rewriting
+    '''
+    def _evaluate(self, circ, bits):
+        for input_id, bit in zip(circ.get_input_ids(), bits):
+            circ.get_node_by_id(input_id).set_label(str(bit))
+        circ.evaluate()
+        return [int(circ.get_node_by_id(output_id).get_label()) for output_id in circ.get_output_ids()]
+
+    def test_evaluate_matches_compile(self):
+        program = bool_circ.adder(1).compile()
+        for k in range(32):
+            bits = [(k >> i) & 1 for i in range(5)]
+            self.assertEqual(self._evaluate(bool_circ.adder(1), bits), program.run(bits))
+
+    def test_evaluate_decoder(self):
+        program = bool_circ.decoder().compile()
+        bits = [1, 0, 1, 1, 0, 0, 1]
+        self.assertEqual(self._evaluate(bool_circ.decoder(), bits), program.run(bits))
+
+    def test_partial_evaluation(self):
+        g = bool_circ()
+        i0 = g.add_node('')
+        i1 = g.add_node('0')
+        g.set_inputs([i0, i1])
+        gate = g.add_node('|', parents={i0:1, i1:1})
+        out = g.add_node('', parents={gate:1})
+        g.set_outputs([out])
+        g.evaluate()
+        # The neutral 0 operand is dropped, the unknown input is kept
+        self.assertEqual(g.get_node_by_id(gate).get_parents(), {i0:1})
+        self.assertEqual(g.get_node_by_id(out).get_label(), '')
+
+    def test_evaluate_keeps_unported_nodes(self):
+        g = bool_circ()
+        i0 = g.add_node('1')
+        i1 = g.add_node('1')
+        gate = g.add_node('&', parents={i0:1, i1:1})
+        out = g.add_node('', parents={gate:1})
+        g.evaluate()
+        self.assertIn(out, g.get_node_ids())
+        self.assertEqual(g.get_node_by_id(out).get_label(), '1')
+
+    def test_custom_rule(self):
+        def pattern(circ, node_id):
+            return circ.get_node_by_id(node_id).get_label() == '!'
+
+        def action(circ, node_id):
+            circ.get_node_by_id(node_id).set_label('~')
+            return circ.get_node_by_id(node_id).get_parents()
+
+        g = bool_circ()
+        i0 = g.add_node('1')
+        g.set_inputs([i0])
+        n = g.add_node('!', parents={i0:1})
+        out = g.add_node('', parents={n:1})
+        g.set_outputs([out])
+        engine = rewrite_engine(bool_circ.rewrite_rules)
+        engine.register(pattern, action)
+        self.assertGreater(engine.run(g), 0)
+        self.assertEqual(g.get_node_by_id(out).get_label(), '0')
+
+
+class OptimizeTest(unittest.TestCase):
+    '''
+    Tests for the optimization passes of boolean circuits
+    '''
+    def test_half_adder(self):
+        adder = bool_circ.adder(1, half=True)
+        program = adder.compile()
+        report = adder.optimize()
+        self.assertGreater(report['nodes_removed'], 0)
+        self.assertGreater(report['edges_removed'], 0)
+        # The constant carry input is folded
+        self.assertEqual(len(adder.get_input_ids()), 4)
+        optimized = adder.compile()
+        for k in range(16):
+            bits = [(k >> i) & 1 for i in range(4)]
+            self.assertEqual(optimized.run(bits), program.run(bits + [0]))
+
+    def test_double_negation_and_copies(self):
+        g = bool_circ()
+        i0 = g.add_node('')
+        g.set_inputs([i0])
+        c = g.add_node(' ', parents={i0:1})
+        n1 = g.add_node('~', parents={c:1})
+        n2 = g.add_node('~', parents={n1:1})
+        dead = g.add_node('&', parents={n2:1})
+        out = g.add_node('', parents={n2:1})
+        g.set_outputs([out])
+        report = g.optimize()
+        self.assertEqual(report['nodes_removed'], 4)
+        self.assertEqual(g.get_node_by_id(i0).get_children(), {out:1})
+        self.assertEqual(g.compile().run([1]), [1])
+
+    def test_unused_inputs(self):
+        g = bool_circ()
+        i0 = g.add_node('0')
+        i1 = g.add_node('')
+        i2 = g.add_node('')
+        g.set_inputs([i0, i1, i2])
+        c0 = g.add_node(' ', parents={i0:1})
+        gate = g.add_node('&', parents={c0:1, i1:1})
+        x = g.add_node('^', parents={c0:1, i2:1})
+        g.set_outputs([g.add_node('', parents={gate:1}), g.add_node('', parents={x:1})])
+        self.assertTrue(g.is_well_formed())
+        report = g.optimize()
+        # i1 only fed the AND folded to 0
+        self.assertEqual(report['inputs_removed'], [i0, i1])
+        self.assertEqual(g.get_input_ids(), [i2])
+        self.assertNotIn(i1, g.get_node_ids())
+        self.assertTrue(g.is_well_formed())
+        self.assertEqual([g.compile().run([b]) for b in range(2)], [[0, 0], [0, 1]])
+
+    def test_random_circuits_stay_well_formed(self):
+        for seed in range(60):
+            circ = bool_circ.random_bool_circ(30, 3, inputs=5, seed=seed)
+            for input_id in circ.get_input_ids()[:2]:
+                circ.get_node_by_id(input_id).set_label(str(seed % 2))
+            circ.optimize()
+            self.assertTrue(circ.is_well_formed())
+
+    def test_constant_folding_alone(self):
+        for seed in range(20):
+            circ = bool_circ.random_bool_circ(30, 3, inputs=5, seed=seed)
+            circ.get_node_by_id(circ.get_input_ids()[0]).set_label('0')
+            program = circ.compile()
+            circ.optimize(passes=['constant_folding'])
+            self.assertTrue(circ.is_well_formed())
+            for k in range(0, 16, 5):
+                bits = [(k >> i) & 1 for i in range(4)]
+                if len(circ.get_input_ids()) == 4:
+                    self.assertEqual(circ.compile().run(bits), program.run([0] + bits))
+
+    def test_selected_passes(self):
+        adder = bool_circ.adder(1, half=True)
+        adder.optimize(passes=['dead_gates'])
+        self.assertEqual(len(adder.get_input_ids()), 5)
+        with self.assertRaises(ValueError):
+            adder.optimize(passes=['invalid'])
+
+
+class StructuralHashingTest(unittest.TestCase):
+    '''
+    Tests for the structural hashing of boolean circuits
+    '''
+    def setUp(self):
+        self.g = bool_circ()
+        self.i0 = self.g.add_node('')
+        self.i1 = self.g.add_node('')
+        self.g.set_inputs([self.i0, self.i1])
+        self.c0 = self.g.add_node(' ', parents={self.i0:1})
+        self.c1 = self.g.add_node(' ', parents={self.i1:1})
+
+    def test_strash(self):
+        a1 = self.g.add_node('&', parents={self.c0:1, self.c1:1})
+        a2 = self.g.add_node('&', parents={self.c1:1, self.c0:1})
+        n1 = self.g.add_node('~', parents={a1:1})
+        n2 = self.g.add_node('~', parents={a2:1})
+        x = self.g.add_node('^', parents={self.c0:1, self.c1:1})
+        outs = [self.g.add_node('', parents={n:1}) for n in [n1, n2, x]]
+        self.g.set_outputs(outs)
+        program = self.g.compile()
+
+        self.assertEqual(self.g.strash(), 2)
+        (copy_id,) = self.g.get_node_by_id(n1).get_children()
+        self.assertEqual(self.g.get_node_by_id(copy_id).get_label(), ' ')
+        self.assertEqual(self.g.get_node_by_id(copy_id).get_children(), {outs[0]:1, outs[1]:1})
+        self.assertNotIn(a2, self.g.get_node_ids())
+        self.assertTrue(self.g.is_well_formed())
+        for k in range(4):
+            bits = [k & 1, k >> 1]
+            self.assertEqual(self.g.compile().run(bits), program.run(bits))
+
+    def test_strash_multi_level(self):
+        # x = a & b built twice, each with its own copy node feeding x ^ c and an output
+        i2 = self.g.add_node('')
+        self.g.set_inputs([self.i0, self.i1, i2])
+        c2 = self.g.add_node(' ', parents={i2:1})
+        outs = []
+        xors = []
+        for _ in range(2):
+            x = self.g.add_node('&', parents={self.c0:1, self.c1:1})
+            copy = self.g.add_node(' ', parents={x:1})
+            xors.append(self.g.add_node('^', parents={copy:1, c2:1}))
+            outs.append(self.g.add_node('', parents={copy:1}))
+        outs += [self.g.add_node('', parents={x:1}) for x in xors]
+        self.g.set_outputs(outs)
+        self.assertTrue(self.g.is_well_formed())
+        table = list(self.g.truth_table())
+
+        self.assertEqual(self.g.strash(), 3)
+        self.assertEqual(sorted(n.get_label() for n in self.g.get_nodes()).count('^'), 1)
+        self.assertEqual(sorted(n.get_label() for n in self.g.get_nodes()).count('&'), 1)
+        self.assertTrue(self.g.is_well_formed())
+        self.assertEqual(list(self.g.truth_table()), table)
+        self.assertEqual(self.g.strash(), 0)
+
+    def test_strash_hamming_encoder(self):
+        circ = bool_circ.hamming_encoder()
+        self.assertTrue(circ.is_well_formed())
+        table = list(circ.truth_table())
+        self.assertEqual(circ.strash(), 2)
+        self.assertTrue(circ.is_well_formed())
+        self.assertEqual(list(circ.truth_table()), table)
+
+    def test_add_gate(self):
+        a1 = self.g.add_gate('&', {self.c0:1, self.c1:1})
+        self.assertEqual(self.g.add_gate('&', {self.c1:1, self.c0:1}), a1)
+        self.assertNotEqual(self.g.add_gate('&', {self.c0:2, self.c1:1}), a1)
+        self.g.remove_node_by_id(a1)
+        self.assertNotEqual(self.g.add_gate('&', {self.c0:1, self.c1:1}), a1)
+
+
+class FrozenCircuitTest(unittest.TestCase):
+    '''
+    Tests for the simulation of frozen boolean circuits
+    '''
+    def test_frozen_compile(self):
+        adder = bool_circ.adder(1)
+        program = adder.compile()
+        frozen = adder.freeze()
+        for k in range(32):
+            bits = [(k >> i) & 1 for i in range(5)]
+            self.assertEqual(frozen.compile().run(bits), program.run(bits))
+
+    def test_thaw(self):
+        thawed = bool_circ.adder(0).freeze().thaw()
+        self.assertIsInstance(thawed, bool_circ)
+        self.assertEqual(thawed.compile().run([1, 1, 0]), [1, 0])
+
+
+class RandomCircuitTest(unittest.TestCase):
+    '''
+    Tests for the generation of random boolean circuits
+    '''
+    def test_well_formed(self):
+        for seed in range(20):
+            circ = bool_circ.random_bool_circ(30, 3, inputs=4, seed=seed)
+            self.assertTrue(circ.is_well_formed())
+            self.assertEqual(len(circ.get_input_ids()), 4)
+
+    def test_seeded(self):
+        first = bool_circ.random_bool_circ(50, 4, seed=7)
+        second = bool_circ.random_bool_circ(50, 4, seed=random.Random(7))
+        self.assertEqual(first.adjacency_matrix(format="csr"), second.adjacency_matrix(format="csr"))
+        self.assertEqual([n.get_label() for n in first.get_nodes()], [n.get_label() for n in second.get_nodes()])
+
+    def test_simulation(self):
+        circ = bool_circ.random_bool_circ(40, 3, inputs=5, seed=1)
+        program = circ.compile()
+        for k in range(32):
+            bits = [(k >> i) & 1 for i in range(5)]
+            evaluated = circ.copy()
+            for input_id, bit in zip(circ.get_input_ids(), bits):
+                evaluated.get_node_by_id(input_id).set_label(str(bit))
+            evaluated = bool_circ(evaluated)
+            evaluated.evaluate()
+            self.assertEqual([int(evaluated.get_node_by_id(output_id).get_label()) for output_id in circ.get_output_ids()],
+                             program.run(bits))
+
+    def test_large(self):
+        circ = bool_circ.random_bool_circ(20000, 3, inputs=64, seed=0)
+        self.assertEqual(len(circ.get_input_ids()), 64)
+        self.assertFalse(circ.is_cyclic())
+
+
+class HierarchicalCircuitTest(unittest.TestCase):
+    '''
+    Tests for hierarchical circuits made of instances of shared definitions
+    '''
+    def _bits(self, value, size):
+        return [int(bit) for bit in format(value, f'0{size}b')]
+
+    def test_hierarchical_adder(self):
+        adder = bool_circ.hierarchical_adder(3)
+        self.assertEqual((adder.input_count(), adder.output_count()), (17, 9))
+        rng = random.Random(0)
+        for _ in range(50):
+            a, b, c = rng.randrange(256), rng.randrange(256), rng.randrange(2)
+            outputs = adder.run(self._bits(a, 8) + self._bits(b, 8) + [c])
+            self.assertEqual(int(''.join(map(str, outputs)), 2), a + b + c)
+
+    def test_shared_definitions(self):
+        adder = bool_circ.hierarchical_adder(12)
+        self.assertEqual(len(adder.definitions()), 13)
+        self.assertEqual(adder.run([1] * 4096 + [0] * 4096 + [1]), [1] + [0] * 4096)
+
+    def test_flatten(self):
+        adder = bool_circ.hierarchical_adder(2)
+        flat = adder.flatten()
+        self.assertIsInstance(flat, bool_circ)
+        self.assertTrue(flat.is_well_formed())
+        program = flat.compile()
+        for k in range(0, 2 ** 9, 7):
+            bits = self._bits(k, 9)
+            self.assertEqual(program.run(bits), adder.run(bits))
+
+    def test_run_words(self):
+        adder = bool_circ.hierarchical_adder(1)
+        vectors = [self._bits(k, 5) for k in range(32)]
+        words = pack_vectors(vectors, 5)
+        outputs = unpack_words(adder.run_words(words, 32), 32)
+        self.assertEqual(outputs, [adder.run(vector) for vector in vectors])
+
+    def test_depth(self):
+        for n in range(4):
+            adder = bool_circ.hierarchical_adder(n)
+            self.assertEqual(adder.depth(), adder.flatten().critical_path_analysis()['depth'])
+
+    def test_shared_signals(self):
+        circ = hierarchical_circuit(2)
+        cell = bool_circ.adder(0)
+        carry, total = circ.add_instance(cell, [0, 1, 0])
+        circ.set_outputs([carry, total, total])
+        self.assertEqual(circ.run([1, 0]), [1, 0, 0])
+        flat = circ.flatten()
+        self.assertTrue(flat.is_well_formed())
+        self.assertEqual(flat.compile().run([1, 0]), [1, 0, 0])
+        self.assertEqual(circ.depth(), flat.critical_path_analysis()['depth'])
+
+    def test_relabelled_definition(self):
+        circ = hierarchical_circuit(2)
+        cell = bool_circ()
+        inputs = [cell.add_node('') for _ in range(2)]
+        gate = cell.add_node('&', parents={inputs[0]:1, inputs[1]:1})
+        cell.set_inputs(inputs)
+        cell.set_outputs([cell.add_node('', parents={gate:1})])
+        circ.set_outputs(circ.add_instance(cell, [0, 1]))
+        self.assertEqual(circ.run([1, 0]), [0])
+        cell.get_node_by_id(gate).set_label('|')
+        self.assertEqual(circ.run([1, 0]), [1])
+        self.assertEqual(circ.run_words([0b01, 0b10], 2), [0b11])
+
+    def test_depth_after_definition_change(self):
+        circ = hierarchical_circuit(2)
+        cell = bool_circ()
+        inputs = [cell.add_node('') for _ in range(2)]
+        gate = cell.add_node('&', parents={inputs[0]:1, inputs[1]:1})
+        out = cell.add_node('', parents={gate:1})
+        cell.set_inputs(inputs)
+        cell.set_outputs([out])
+        circ.set_outputs(circ.add_instance(cell, [0, 1]))
+        depth = circ.depth()
+        cell.remove_edge(gate, out)
+        cell.add_node('~', parents={gate:1}, children={out:1})
+        self.assertEqual(circ.depth(), depth + 1)
+
+    def test_flatten_unread_output(self):
+        circ = hierarchical_circuit(3)
+        carry, _ = circ.add_instance(bool_circ.adder(0), [0, 1, 2])
+        circ.set_outputs([carry])
+        flat = circ.flatten()
+        self.assertTrue(flat.is_well_formed())
+        program = flat.compile()
+        for k in range(8):
+            bits = [(k >> i) & 1 for i in range(3)]
+            self.assertEqual(program.run(bits), circ.run(bits))
+
+    def test_invalid_instances(self):
+        circ = hierarchical_circuit(2)
+        with self.assertRaises(ValueError):
+            circ.add_instance(bool_circ.adder(0), [0, 1])
+        with self.assertRaises(ValueError):
+            circ.add_instance(bool_circ.adder(0), [0, 1, 2])
+        with self.assertRaises(ValueError):
+            circ.set_outputs([2])
+
+
+class FromGatesTest(unittest.TestCase):
+    '''
+    Tests for the bulk construction of boolean circuits from gate lists
+    '''
+    def test_from_gates(self):
+        # x0 & x1, shared by a negation and an output, and a dead XOR
+        circ = bool_circ.from_gates(2, [('&', [0, 1]), ('^', [0, 1]), ('~', [2])], [4, 2])
+        self.assertTrue(circ.is_well_formed())
+        self.assertNotIn('^', [n.get_label() for n in circ.get_nodes()])
+        self.assertEqual([n.get_label() for n in circ.get_nodes()].count(' '), 1)
+        program = circ.compile()
+        self.assertEqual([program.run([a, b]) for a in range(2) for b in range(2)], [[1, 0], [1, 0], [1, 0], [0, 1]])
+
+    def test_invalid_operand(self):
+        with self.assertRaises(ValueError):
+            bool_circ.from_gates(1, [('~', [1])], [1])
+
+
+class AdderGeneratorTest(unittest.TestCase):
+    '''
+    Tests for the ripple-carry, carry-lookahead and parallel-prefix adder generators
+    '''
+    generators = ['ripple_carry_adder', 'carry_lookahead_adder', 'kogge_stone_adder', 'brent_kung_adder']
+
+    def _bits(self, value, size):
+        return [int(bit) for bit in format(value, f'0{size}b')]
+
+    def _check(self, circ, width, pairs):
+        program = circ.compile()
+        for a, b, c in pairs:
+            outputs = program.run(self._bits(a, width) + self._bits(b, width) + [c])
+            self.assertEqual(int(''.join(map(str, outputs)), 2), a + b + c)
+
+    def test_exhaustive(self):
+        for name in self.generators:
+            for width in range(1, 4):
+                circ = getattr(bool_circ, name)(width)
+                self.assertTrue(circ.is_well_formed())
+                self._check(circ, width, [(a, b, c) for a in range(2 ** width) for b in range(2 ** width) for c in range(2)])
+
+    def test_arbitrary_widths(self):
+        rng = random.Random(0)
+        for name in self.generators:
+            for width in (5, 7, 13, 24):
+                pairs = [(rng.randrange(2 ** width), rng.randrange(2 ** width), rng.randrange(2)) for _ in range(30)]
+                self._check(getattr(bool_circ, name)(width), width, pairs)
+        self._check(bool_circ.carry_lookahead_adder(10, block_size=3), 10, [(1023, 1, 0), (512, 511, 1)])
+
+    def test_ports(self):
+        full_adder = bool_circ.adder(0).compile()
+        for name in self.generators:
+            program = getattr(bool_circ, name)(1).compile()
+            for k in range(8):
+                bits = self._bits(k, 3)
+                self.assertEqual(program.run(bits), full_adder.run(bits))
+
+    def test_depths(self):
+        ripple = bool_circ.ripple_carry_adder(32)
+        lookahead = bool_circ.carry_lookahead_adder(32)
+        kogge_stone = bool_circ.kogge_stone_adder(32)
+        brent_kung = bool_circ.brent_kung_adder(32)
+        self.assertLess(lookahead.graph_depth(), ripple.graph_depth())
+        self.assertLess(brent_kung.graph_depth(), ripple.graph_depth())
+        self.assertLess(kogge_stone.graph_depth(), brent_kung.graph_depth())
+        self.assertLess(len(brent_kung.get_nodes()), len(kogge_stone.get_nodes()))
+
+    def test_invalid_width(self):
+        for name in self.generators:
+            with self.assertRaises(ValueError):
+                getattr(bool_circ, name)(0)
+
+
+class ConnectedComponentsTest(unittest.TestCase):
+    '''
+    Tests for the separation of boolean circuits into independent circuits
+    '''
+    def test_separate_adders(self):
+        circ = bool_circ(open_digraph.parallel(bool_circ.adder(0), bool_circ.adder(0)))
+        parts = circ.separate_connected_components()
+        self.assertEqual(len(parts), 2)
+        for part in parts:
+            self.assertIsInstance(part, bool_circ)
+            self.assertEqual(part.compile().run([1, 1, 1]), [1, 1])
+        self.assertEqual(parts[0].get_input_ids() + parts[1].get_input_ids(), circ.get_input_ids())
+
+
+class CopyOnWriteTest(unittest.TestCase):
+    '''
+    Tests for the sharing of nodes between boolean circuits and the graphs they are built from
+    '''
+    def test_constructor_shares_nodes(self):
+        g = bool_circ(bool_circ.adder(1))
+        circ = bool_circ(g)
+        self.assertTrue(all(circ._nodes[i] is n for i, n in g._nodes.items()))
+        self.assertEqual(circ.compile().run([1, 0, 1, 1, 0]), g.compile().run([1, 0, 1, 1, 0]))
+        self.assertTrue(circ.is_well_formed())
+        self.assertTrue(all(circ._nodes[i] is n for i, n in g._nodes.items()))
+
+    def test_constructor_nodes_handed_out(self):
+        g = bool_circ.adder(1)
+        output_id = g.get_output_ids()[0]
+        n = g.get_node_by_id(output_id)
+        circ = bool_circ(g)
+        n.set_label('X')
+        self.assertEqual(circ.get_node_by_id(output_id).get_label(), '')
+        self.assertEqual(g.get_node_by_id(output_id).get_label(), 'X')
+
+    def test_optimize_copy(self):
+        g = bool_circ.adder(1)
+        expected = list(g.truth_table())
+        circ = bool_circ(g)
+        circ.get_node_by_id(circ.get_input_ids()[0]).set_label('1')
+        circ.optimize()
+        self.assertEqual(len(circ.get_input_ids()), 4)
+        self.assertEqual(len(g.get_input_ids()), 5)
+        self.assertEqual(list(g.truth_table()), expected)
+
+
 if __name__ == '__main__':
     unittest.main()
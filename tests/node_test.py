@@ -29,5 +29,13 @@ class CopyTest(unittest.TestCase):
         self.assertEqual(n0.get_parents(), n0_copy.get_parents())
 
 
+class SlotsTest(unittest.TestCase):
+    def test_no_instance_dict(self):
+        n0 = node(0, 'i', {}, {})
+        self.assertFalse(hasattr(n0, '__dict__'))
+        with self.assertRaises(AttributeError):
+            n0.other = 1
+
+
 if __name__ == '__main__': 
     unittest.main() 
@@ -248,6 +248,24 @@ class ParallelCompositionTest(CompositionTest):
         self.gr1.iparallel(open_digraph.empty())
         self.assertTrue(self.gr1.get_node_map() == prev_map)
 
+    def test_iparallel_consume(self):
+        moved = self.gr2.get_node_by_id(3)
+        self.gr1.iparallel(self.gr2, consume=True)
+        self.assertEqual(self.gr1.get_input_ids(), [0, 1, 2, 7, 8])
+        self.assertEqual(self.gr1.get_output_ids(), [5, 6, 12])
+        self.assertIs(self.gr1.get_node_by_id(10), moved)
+        self.assertEqual(moved.get_parents(), {7:1})
+        self.assertEqual((self.gr2.get_node_ids(), self.gr2.get_input_ids(), self.gr2.get_output_ids()), ([], [], []))
+
+    def test_parallel_consume(self):
+        expected = open_digraph.parallel(self.gr1, self.gr2)
+        composition = open_digraph.parallel(self.gr1, self.gr2, consume=True)
+        self.assertIs(composition, self.gr1)
+        self.assertEqual({n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in composition.get_nodes()},
+                         {n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in expected.get_nodes()})
+        with self.assertRaises(ValueError):
+            self.gr1.iparallel(self.gr1, consume=True)
+
 
 class SequentialCompositionTest(CompositionTest):
     def test_icomposition(self):
@@ -286,6 +304,34 @@ class SequentialCompositionTest(CompositionTest):
         self.assertTrue(gr.get_node_by_id(5).get_children() == {7:1})
         self.assertTrue(gr.get_node_by_id(6).get_children() == {8:1})
 
+    def test_icomposition_consume(self):
+        moved = self.gr1.get_node_by_id(4)
+        self.gr2.icompose(self.gr1, consume=True)
+        self.assertEqual(self.gr2.get_input_ids(), [0, 1, 2])
+        self.assertEqual(self.gr2.get_output_ids(), [12])
+        self.assertIs(self.gr2.get_node_by_id(4), moved)
+        self.assertEqual(self.gr2.get_node_by_id(6).get_children(), {8:1})
+        self.assertEqual(self.gr1.get_node_ids(), [])
+
+    def test_icomposition_shifts_smaller(self):
+        # self (the larger graph) keeps its ids, f is shifted past them
+        labels = {n.get_id(): n.get_label() for n in self.gr2.get_nodes()}
+        f = open_digraph([0], [2, 3], [node(0, 'i', {}, {1:1}), node(1, 'a', {0:1}, {2:1, 3:1}),
+                                       node(2, 'o', {1:1}, {}), node(3, 'p', {1:1}, {})])
+        self.gr2.icompose(f)
+        self.assertEqual({k: self.gr2.get_node_by_id(k).get_label() for k in labels}, labels)
+        self.assertEqual(self.gr2.get_input_ids(), [6])
+        self.assertEqual(self.gr2.get_node_by_id(8).get_children(), {0:1})
+        self.assertEqual(self.gr2.get_node_by_id(9).get_children(), {1:1})
+        self.assertEqual(f.get_node_ids(), [0, 1, 2, 3])
+
+    def test_composition_consume(self):
+        expected = open_digraph.compose(self.gr2, self.gr1)
+        gr = open_digraph.compose(self.gr2, self.gr1, consume=True)
+        self.assertIs(gr, self.gr2)
+        self.assertEqual({n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in gr.get_nodes()},
+                         {n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in expected.get_nodes()})
+
     def test_composition_invalid(self):
         with self.assertRaises(ValueError):
             open_digraph.compose(self.gr1, self.gr1)
@@ -338,6 +384,31 @@ class DijkstraTest(unittest.TestCase):
         result = self.gr.common_ancestors(self.gr.get_node_by_id(6), self.gr.get_node_by_id(3))
         self.assertEqual(result, {})
 
+    def test_bfs(self):
+        self.assertEqual(self.gr.bfs(0), ({0: 0, 1: 2, 2: 4, 3: 1, 4: 3, 5: 2, 6: 4}, {1: 3, 2: 4, 3: 0, 4: 5, 5: 3, 6: 4}))
+        self.assertEqual(self.gr.bfs(2, direction=1), ({2: 0, 4: 1, 5: 2, 6: 2}, {4: 2, 5: 4, 6: 4}))
+        with self.assertRaises(ValueError):
+            self.gr.bfs(7)
+
+    def test_multi_source(self):
+        self.assertEqual(self.gr.distances_from_inputs(), {0: 0, 1: 0, 2: 0, 3: 1, 4: 1, 5: 2, 6: 2})
+        self.assertEqual(self.gr.distances_to_outputs(), {5: 0, 6: 0, 3: 1, 4: 1, 0: 2, 1: 2, 2: 2})
+        dist, prev = self.gr.shortest_paths([0, 4], direction=1)
+        self.assertEqual(dist, {0: 0, 4: 0, 3: 1, 5: 1, 6: 1})
+        self.assertEqual(prev, {3: 0, 5: 4, 6: 4})
+
+    def test_weighted(self):
+        weights = {(0, 3): 1, (1, 3): 1, (2, 4): 1, (3, 5): 5, (4, 5): 1, (4, 6): 1}
+        dist, prev = self.gr.shortest_paths([0], weight=lambda u, v: weights[(u, v)])
+        self.assertEqual(dist, {0: 0, 1: 2, 2: 8, 3: 1, 4: 7, 5: 6, 6: 8})
+        self.assertEqual(self.gr.shortest_paths([0, 2], direction=1)[1][5], 3)
+        dist, prev = self.gr.shortest_paths([0, 2], direction=1, weight=lambda u, v: weights[(u, v)])
+        self.assertEqual(dist[5], 2)
+        self.assertEqual(prev[5], 4)
+        self.assertEqual(self.gr.distances_to_outputs(weight=lambda u, v: weights[(u, v)])[0], 6)
+        with self.assertRaises(ValueError):
+            self.gr.shortest_paths([0], weight=lambda u, v: -1)
+
 
 class TopologicalSortTest(unittest.TestCase):
     '''
@@ -373,5 +444,509 @@ class TopologicalSortTest(unittest.TestCase):
     def test_longest_path(self):
         self.assertEqual(self.gr.longest_path(0, 5), (2, 3))
 
+    def test_cached_topological_sort(self):
+        top_sort = self.gr.topological_sort()
+        self.assertIs(self.gr.topological_sort(), top_sort)
+        version = self.gr.get_version()
+        self.gr.remove_edge(3, 5)
+        self.assertGreater(self.gr.get_version(), version)
+        self.assertEqual(self.gr.topological_sort(), [set([0, 2]), set([3, 4, 5])])
+        self.assertEqual(self.gr.node_depth(5), 2)
+        self.assertEqual(self.gr.graph_depth(), 2)
+
+    def test_invalidated_by_ports(self):
+        self.assertNotIn(6, self.gr.node_depths())
+        self.gr.set_outputs([])
+        self.assertEqual(self.gr.node_depth(6), 3)
+
+    def test_cyclic_topological_sort(self):
+        self.gr.add_edge(5, 0)
+        with self.assertRaises(ValueError):
+            self.gr.topological_sort()
+
+
+class CriticalPathTest(unittest.TestCase):
+    '''
+    Tests for the all-nodes critical path analysis
+    '''
+    def setUp(self):
+        n0 = node(0, 'i', {}, {1:1, 3:1})
+        n1 = node(1, 'a', {0:1}, {2:1})
+        n2 = node(2, 'b', {1:1}, {4:1, 5:1})
+        n3 = node(3, 'c', {0:1}, {4:1})
+        n4 = node(4, 'o', {2:1, 3:1}, {})
+        n5 = node(5, 'p', {2:1}, {})
+        self.gr = open_digraph([0], [4, 5], [n0, n1, n2, n3, n4, n5])
+
+    def test_arrival_required_slack(self):
+        analysis = self.gr.critical_path_analysis()
+        self.assertEqual(analysis['depth'], 3)
+        self.assertEqual(analysis['arrival'], {0:0, 1:1, 2:2, 3:1, 4:3, 5:3})
+        self.assertEqual(analysis['required'], {0:0, 1:1, 2:2, 3:2, 4:3, 5:3})
+        self.assertEqual(analysis['slack'], {0:0, 1:0, 2:0, 3:1, 4:0, 5:0})
+
+    def test_critical_paths(self):
+        self.assertEqual(self.gr.critical_path(4), [0, 1, 2, 4])
+        self.assertEqual(self.gr.critical_path(5), [0, 1, 2, 5])
+        self.assertEqual(self.gr.critical_path(0), [0])
+        with self.assertRaises(ValueError):
+            self.gr.critical_path(42)
+
+    def test_cached_analysis(self):
+        self.assertIs(self.gr.critical_path_analysis(), self.gr.critical_path_analysis())
+        self.gr.remove_edge(2, 4)
+        analysis = self.gr.critical_path_analysis()
+        self.assertEqual(self.gr.critical_path(4), [0, 3, 4])
+        self.assertEqual(analysis['slack'][3], 1)
+
+    def test_empty_analysis(self):
+        analysis = open_digraph.empty().critical_path_analysis()
+        self.assertEqual(analysis['depth'], 0)
+        self.assertEqual(analysis['critical_parent'], {})
+
+    def test_cyclic_analysis(self):
+        self.gr.add_edge(2, 1)
+        with self.assertRaises(ValueError):
+            self.gr.critical_path_analysis()
+
+
+class ReachabilityTest(unittest.TestCase):
+    '''
+    Tests for the reachability index of acyclic open directed graphs
+    '''
+    def setUp(self):
+        n0 = node(0, '1-0', {}, {3:1})
+        n1 = node(1, '1-1', {}, {3:1})
+        n2 = node(2, '1-2', {}, {4:1})
+        n3 = node(3, '1-3', {0:1, 1:1}, {5:1})
+        n4 = node(4, '1-4', {2:1}, {5:1, 6:2})
+        n5 = node(5, '1-5', {3:1, 4:1}, {})
+        n6 = node(6, '1-6', {4:2}, {})
+        self.gr = open_digraph([0, 1, 2], [5, 6], [n0, n1, n2, n3, n4, n5, n6])
+
+    def test_ancestors(self):
+        index = self.gr.reachability()
+        self.assertTrue(index.is_ancestor(0, 5))
+        self.assertFalse(index.is_ancestor(5, 0))
+        self.assertFalse(index.is_ancestor(3, 3))
+        self.assertTrue(index.is_descendant(6, 2))
+        self.assertEqual(index.ancestors(5), {0, 1, 2, 3, 4})
+        self.assertEqual(index.descendants(2), {4, 5, 6})
+        with self.assertRaises(ValueError):
+            index.ancestors(7)
+
+    def test_common_ancestors(self):
+        index = self.gr.reachability()
+        self.assertEqual(index.common_ancestors([5, 4]), {2, 4})
+        self.assertEqual(index.common_ancestors([6, 3]), set())
+        self.assertEqual(index.common_ancestors([5, 6, 4]), {2, 4})
+        expected = self.gr.common_ancestors(self.gr.get_node_by_id(5), self.gr.get_node_by_id(4))
+        self.assertEqual(index.common_ancestors([5, 4]), {n.get_id() for n in expected})
+
+    def test_supports_and_cones(self):
+        index = self.gr.reachability()
+        self.assertEqual(index.supports(), {5: {0, 1, 2}, 6: {2}})
+        self.assertEqual(index.fanout_cones(), {0: {3, 5}, 1: {3, 5}, 2: {4, 5, 6}})
+        self.assertEqual(index.fanout_cone(3), {5})
+
+    def test_cached_index(self):
+        index = self.gr.reachability()
+        self.assertIs(self.gr.reachability(), index)
+        self.gr.remove_edge(4, 5)
+        self.assertEqual(self.gr.reachability().support(5), {0, 1})
+        self.gr.add_edge(4, 3)
+        self.gr.add_edge(3, 4)
+        with self.assertRaises(ValueError):
+            self.gr.reachability()
+
+
+class ConnectedComponentsTest(unittest.TestCase):
+    '''
+    Tests for the separation of open directed graphs into connected components
+    '''
+    def setUp(self):
+        n0 = node(0, 'a', {}, {2:1})
+        n1 = node(1, 'b', {}, {4:1})
+        n2 = node(2, 'c', {0:1}, {3:1})
+        n3 = node(3, 'd', {2:1}, {})
+        n4 = node(4, 'e', {1:1}, {5:2})
+        n5 = node(5, 'f', {4:2}, {})
+        self.gr = open_digraph([1, 0], [5, 3], [n0, n1, n2, n3, n4, n5])
+
+    def test_connected_components(self):
+        self.assertEqual(self.gr.connected_components(), [{0, 2, 3}, {1, 4, 5}])
+        self.assertEqual(open_digraph.empty().connected_components(), [])
+
+    def test_separate(self):
+        first, second = self.gr.separate_connected_components()
+        self.assertEqual(sorted(first.get_node_ids()), [0, 2, 3])
+        self.assertEqual((first.get_input_ids(), first.get_output_ids()), ([0], [3]))
+        self.assertEqual((second.get_input_ids(), second.get_output_ids()), ([1], [5]))
+        self.assertEqual(second.get_node_by_id(5).get_parents(), {4:2})
+        self.assertTrue(first.is_well_formed() and second.is_well_formed())
+        first.add_edge(2, 3)
+        self.assertEqual(self.gr.get_node_by_id(3).get_parents(), {2:1})
+
+    def test_views(self):
+        first, second = self.gr.separate_connected_components(views=True)
+        self.assertIs(first.get_node_by_id(2), self.gr.get_node_by_id(2))
+        self.assertEqual(second.get_output_ids(), [5])
+
+    def test_long_chain(self):
+        gr = open_digraph.empty()
+        previous = gr.add_node()
+        for _ in range(5000):
+            previous = gr.add_node(parents={previous:1})
+        self.assertEqual(len(gr.separate_connected_components()[0].get_node_ids()), 5001)
+
+
+class AdjacencyMatrixTest(unittest.TestCase):
+    '''
+    Tests for the adjacency matrix export and import of open directed graphs
+    '''
+    def setUp(self):
+        n0 = node(0, 'i', {}, {4:1})
+        n4 = node(4, 'a', {0:1}, {7:2})
+        n7 = node(7, 'b', {4:2}, {9:1})
+        n9 = node(9, 'o', {7:1}, {})
+        self.gr = open_digraph([0], [9], [n0, n4, n7, n9])
+
+    def test_dense(self):
+        M, ids = self.gr.adjacency_matrix()
+        self.assertEqual(ids, [0, 4, 7, 9])
+        self.assertEqual([[int(m) for m in row] for row in M], [[0, 1, 0, 0], [0, 0, 2, 0], [0, 0, 0, 1], [0, 0, 0, 0]])
+
+    def test_csr(self):
+        (data, indices, indptr), ids = self.gr.adjacency_matrix(format="csr")
+        self.assertEqual((list(data), list(indices), list(indptr)), ([1, 2, 1], [1, 2, 3], [0, 1, 2, 3, 3]))
+        with self.assertRaises(ValueError):
+            self.gr.adjacency_matrix(format="coo")
+
+    def test_round_trip(self):
+        labels = [self.gr.get_node_by_id(identity).get_label() for identity in [0, 4, 7, 9]]
+        for form in ("dense", "csr"):
+            M, ids = self.gr.adjacency_matrix(format=form)
+            g = open_digraph.from_adjacency_matrix(M, [0], [9], labels=labels, ids=ids)
+            self.assertTrue(g.is_well_formed())
+            self.assertEqual({n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in g.get_nodes()},
+                             {n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in self.gr.get_nodes()})
+
+    def test_from_lists(self):
+        g = open_digraph.from_adjacency_matrix([[0, 1, 0], [0, 0, 3], [0, 0, 0]], [0], [2])
+        self.assertEqual(g.get_node_by_id(1).get_children(), {2:3})
+        self.assertEqual(g.get_node_by_id(2).get_parents(), {1:3})
+        self.assertTrue(g.is_well_formed())
+        with self.assertRaises(ValueError):
+            open_digraph.from_adjacency_matrix([[0, 1], [0]], [], [])
+        with self.assertRaises(ValueError):
+            open_digraph.from_adjacency_matrix([[0, -1], [0, 0]], [], [])
+
+
+class FromEdgesTest(unittest.TestCase):
+    '''
+    Tests for the bulk construction of open directed graphs from edge lists
+    '''
+    def test_from_edges(self):
+        g = open_digraph.from_edges(4, [(0, 1), (1, 2), (1, 2), (2, 3)], ['i', 'a', 'b', 'o'], [0], [3])
+        self.assertEqual(g.get_node_by_id(1).get_children(), {2:2})
+        self.assertEqual(g.get_node_by_id(2).get_parents(), {1:2})
+        self.assertEqual(g.get_node_by_id(3).get_label(), 'o')
+        self.assertEqual((g.get_input_ids(), g.get_output_ids()), ([0], [3]))
+        self.assertEqual(g.new_id(), 4)
+
+    def test_default_labels(self):
+        g = open_digraph.from_edges(2, [(0, 1)], None, [], [])
+        self.assertEqual([n.get_label() for n in g.get_nodes()], ['', ''])
+        with self.assertRaises(ValueError):
+            open_digraph.from_edges(2, [(0, 1)], ['a'], [], [])
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            open_digraph.from_edges(2, [(0, 2)], None, [], [])
+        with self.assertRaises(ValueError):
+            open_digraph.from_edges(2, [(-1, 0)], None, [], [])
+        with self.assertRaises(ValueError):
+            open_digraph.from_edges(3, [(1, 0), (0, 2)], None, [0], [2])
+        g = open_digraph.from_edges(3, [(1, 0), (0, 2)], None, [0], [2], validate=False)
+        self.assertFalse(g.is_well_formed())
+
+    def test_large(self):
+        n = 20000
+        g = open_digraph.from_edges(n, [(i, i + 1) for i in range(n - 1)] * 2, None, [], [])
+        self.assertEqual(g.get_node_by_id(n - 1).get_parents(), {n - 2:2})
+
+
+class RandomDagTest(unittest.TestCase):
+    '''
+    Tests for the generation of sparse random directed acyclic graphs
+    '''
+    def test_random_dag(self):
+        g = open_digraph.random_dag(100, fan_in=3, seed=0)
+        self.assertTrue(g.is_well_formed())
+        self.assertFalse(g.is_cyclic())
+        self.assertEqual(sum(n.indegree() for n in g.get_nodes()), 3 * 97 + 1 + 2)
+
+    def test_fan_in_distribution(self):
+        g = open_digraph.random_dag(100, fan_in=lambda rng: rng.randint(0, 1), seed=1)
+        self.assertTrue(all(n.indegree() <= 1 for n in g.get_nodes()))
+
+    def test_seeded(self):
+        first = open_digraph.random_dag(50, seed=3)
+        second = open_digraph.random_dag(50, seed=3)
+        self.assertEqual(first.adjacency_matrix(format="csr"), second.adjacency_matrix(format="csr"))
+
+
+class CopyOnWriteTest(unittest.TestCase):
+    '''
+    Tests for the copy on write copies of open directed graphs
+    '''
+    def setUp(self):
+        n0 = node(0, 'i', {}, {1:1})
+        n1 = node(1, 'a', {0:1}, {2:1, 3:1})
+        n2 = node(2, 'b', {1:1}, {3:1})
+        n3 = node(3, 'o', {1:1, 2:1}, {})
+        # copied once so that no node of self.gr is held by the test
+        self.gr = open_digraph([0], [3], [n0, n1, n2, n3]).copy()
+        self.gr_copy = self.gr.copy()
+
+    def test_shared_until_modified(self):
+        self.assertTrue(all(self.gr_copy._nodes[i] is self.gr._nodes[i] for i in range(4)))
+        self.gr_copy.add_edge(1, 2)
+        self.assertIsNot(self.gr_copy._nodes[1], self.gr._nodes[1])
+        self.assertIsNot(self.gr_copy._nodes[2], self.gr._nodes[2])
+        self.assertIs(self.gr_copy._nodes[3], self.gr._nodes[3])
+        self.assertEqual(self.gr_copy.get_node_by_id(2).get_parents(), {1:2})
+        self.assertEqual(self.gr.get_node_by_id(2).get_parents(), {1:1})
+
+    def test_original_modified(self):
+        self.gr.get_node_by_id(1).set_label('c')
+        self.gr.remove_node_by_id(2)
+        self.assertEqual(self.gr_copy.get_node_by_id(1).get_label(), 'a')
+        self.assertEqual(self.gr_copy.get_node_by_id(1).get_children(), {2:1, 3:1})
+        self.assertEqual(self.gr_copy.get_node_by_id(3).get_parents(), {1:1, 2:1})
+
+    def test_ports(self):
+        self.assertIsNot(self.gr_copy.get_input_ids(), self.gr.get_input_ids())
+        self.gr_copy.add_input_id(2)
+        self.assertEqual(self.gr.get_input_ids(), [0])
+        self.assertFalse(self.gr.is_input(2))
+
+    def test_analyses_do_not_copy(self):
+        self.gr_copy.topological_sort()
+        self.gr_copy.freeze()
+        self.gr_copy.distances_from_inputs()
+        self.gr_copy.reachability()
+        self.assertTrue(all(self.gr_copy._nodes[i] is self.gr._nodes[i] for i in range(4)))
+
+    def test_nodes_handed_out(self):
+        nodes = self.gr_copy.get_node_map()
+        self.assertTrue(all(nodes[i] is not self.gr._nodes[i] for i in range(4)))
+        nodes[1].set_label('c')
+        self.assertEqual(self.gr.get_node_by_id(1).get_label(), 'a')
+
+    def test_nodes_handed_out_before_copy(self):
+        n = self.gr.get_node_by_id(1)
+        second = self.gr.copy()
+        n.set_label('X')
+        self.assertEqual(self.gr.get_node_by_id(1).get_label(), 'X')
+        self.assertEqual(second.get_node_by_id(1).get_label(), 'a')
+        self.assertIs(second._nodes[2], self.gr._nodes[2])
+
+    def test_constructor_nodes(self):
+        n0 = node(0, 'i', {}, {1:1})
+        n1 = node(1, 'o', {0:1}, {})
+        gr = open_digraph([0], [1], [n0, n1])
+        second = gr.copy()
+        n1.set_label('X')
+        self.assertEqual(gr.get_node_by_id(1).get_label(), 'X')
+        self.assertEqual(second.get_node_by_id(1).get_label(), 'o')
+
+    def test_built_graph_shared(self):
+        gr = open_digraph.empty()
+        n0 = gr.add_node('a')
+        n1 = gr.add_node('b', parents={n0:1})
+        gr.add_node('c', parents={n1:1})
+        gr_copy = gr.copy()
+        self.assertTrue(all(gr._nodes[k] is gr_copy._nodes[k] for k in gr.get_node_ids()))
+
+    def test_composed_graph_shared(self):
+        gr = self.gr.copy()
+        gr.icompose(open_digraph.identity(1).copy())
+        gr.shift_indices(3)
+        gr_copy = gr.copy()
+        self.assertTrue(all(gr._nodes[k] is gr_copy._nodes[k] for k in gr.get_node_ids()))
+
+    def test_copy_of_copy(self):
+        second = self.gr_copy.copy()
+        self.gr_copy.add_node('d', parents={2:1})
+        second.remove_edge(1, 3)
+        self.assertEqual(self.gr.get_node_by_id(2).get_children(), {3:1})
+        self.assertEqual(second.get_node_by_id(2).get_children(), {3:1})
+        self.assertEqual(self.gr_copy.get_node_by_id(1).get_children(), {2:1, 3:1})
+        self.assertEqual(self.gr.get_node_by_id(3).get_parents(), {1:1, 2:1})
+
+
+class FreezeTest(unittest.TestCase):
+    '''
+    Tests for the frozen (compressed sparse row) snapshots of open directed graphs
+    '''
+    def setUp(self):
+        n0 = node(0, '1-0', {}, {3:1, 5:1})
+        n1 = node(1, '1-1', {}, {3:1})
+        n2 = node(2, '1-2', {}, {4:1})
+        n3 = node(3, '1-3', {0:1, 1:1}, {5:1})
+        n4 = node(4, '1-4', {2:1}, {5:1, 8:2})
+        n5 = node(5, '1-5', {0:1, 3:1, 4:1}, {})
+        n8 = node(8, '1-8', {4:2}, {})
+        self.gr = open_digraph([1], [8], [n0, n1, n2, n3, n4, n5, n8])
+        self.frozen = self.gr.freeze()
+
+    def test_structure(self):
+        self.assertEqual(self.frozen.node_count(), 7)
+        self.assertEqual(self.frozen.edge_count(), 8)
+        i = self.frozen.index_of(8)
+        self.assertEqual(self.frozen.get_id(i), 8)
+        self.assertEqual(self.frozen.get_label(i), '1-8')
+        self.assertEqual(self.frozen.indegree(i), 2)
+        self.assertEqual([(self.frozen.get_id(j), m) for j, m in self.frozen.children(self.frozen.index_of(4))], [(5, 1), (8, 2)])
+        self.assertEqual(self.frozen.get_input_ids(), [1])
+        with self.assertRaises(ValueError):
+            self.frozen.index_of(7)
+
+    def test_thaw(self):
+        g = self.frozen.thaw()
+        self.assertEqual(g.get_input_ids(), [1])
+        self.assertEqual(g.get_output_ids(), [8])
+        for n in self.gr.get_nodes():
+            m = g.get_node_by_id(n.get_id())
+            self.assertEqual((m.get_label(), m.get_parents(), m.get_children()), (n.get_label(), n.get_parents(), n.get_children()))
+
+    def test_topological_sort(self):
+        self.assertEqual(self.frozen.topological_sort(), self.gr.topological_sort())
+
+    def test_distances(self):
+        self.assertEqual(self.frozen.distances(2, direction=1), {2: 0, 4: 1, 5: 2, 8: 2})
+        self.assertEqual(self.frozen.distances(5, direction=-1), {5: 0, 0: 1, 3: 1, 4: 1, 1: 2, 2: 2})
+
+
+class IdAllocationTest(unittest.TestCase):
+    '''
+    Tests for the allocation of node ids
+    '''
+    def test_monotonic(self):
+        gr = open_digraph([], [], [node(0, 'a', {}, {}), node(4, 'b', {}, {})])
+        self.assertEqual(gr.add_node(), 5)
+        gr.remove_node_by_id(5)
+        self.assertEqual(gr.add_node(), 6)
+
+    def test_reuse(self):
+        gr = open_digraph([], [], [node(0, 'a', {}, {}), node(4, 'b', {}, {})])
+        gr.set_id_reuse(True)
+        gr.remove_nodes_by_id([4, 0])
+        self.assertEqual(gr.add_node(), 0)
+        self.assertEqual(gr.add_node(), 4)
+        self.assertEqual(gr.add_node(), 5)
+
+    def test_after_composition(self):
+        gr = open_digraph([], [], [node(0, 'a', {}, {})])
+        gr.iparallel(open_digraph([], [], [node(0, 'b', {}, {}), node(1, 'c', {}, {})]))
+        self.assertEqual(gr.add_node(), 3)
+        gr.shift_indices(-1)
+        self.assertEqual(gr.add_node(), 3)
+
+    def test_id_bound(self):
+        gr = open_digraph([], [], [node(0, 'a', {}, {}), node(4, 'b', {}, {})])
+        self.assertEqual(gr.id_bound(), 5)
+        gr.remove_node_by_id(4)
+        gr.iparallel(open_digraph([], [], [node(2, 'c', {}, {}), node(3, 'd', {}, {})]))
+        self.assertEqual(gr.get_node_ids(), [0, 5, 6])
+        self.assertEqual(gr.id_bound(), 7)
+
+
+class PortRegistryTest(unittest.TestCase):
+    '''
+    Tests for the registries of input and output nodes
+    '''
+    def setUp(self):
+        self.gr = open_digraph.empty()
+        self.i = self.gr.add_node('i')
+        self.o = self.gr.add_node('o')
+        self.gr.add_input_id(self.i)
+        self.gr.add_output_id(self.o)
+
+    def test_membership(self):
+        self.assertTrue(self.gr.is_input(self.i))
+        self.assertFalse(self.gr.is_input(self.o))
+        self.assertTrue(self.gr.is_output(self.o))
+        self.gr.set_inputs([])
+        self.assertFalse(self.gr.is_input(self.i))
+
+    def test_invalid_ports(self):
+        with self.assertRaises(ValueError):
+            self.gr.add_input_id(42)
+        with self.assertRaises(ValueError):
+            self.gr.add_output_id(42)
+        with self.assertRaises(ValueError):
+            self.gr.add_edge(self.o, self.i)
+
+    def test_composition(self):
+        self.gr.iparallel(self.gr)
+        self.assertEqual(self.gr.get_input_ids(), [0, 2])
+        self.assertTrue(self.gr.is_input(2))
+        self.assertTrue(self.gr.is_output(3))
+
+    def test_copy(self):
+        gr_copy = self.gr.copy()
+        gr_copy.add_input_id(self.o)
+        self.assertEqual(self.gr.get_input_ids(), [self.i])
+        self.assertFalse(self.gr.is_input(self.o))
+
+
+class CycleTest(unittest.TestCase):
+    '''
+    Tests for strongly connected components and cycle detection
+    '''
+    def setUp(self):
+        n0 = node(0, 'a', {}, {1:1})
+        n1 = node(1, 'b', {0:1, 3:1}, {2:1})
+        n2 = node(2, 'c', {1:1}, {3:1, 4:1})
+        n3 = node(3, 'd', {2:1}, {1:1})
+        n4 = node(4, 'e', {2:1}, {})
+        self.gr = open_digraph([0], [4], [n0, n1, n2, n3, n4])
+
+    def test_strongly_connected_components(self):
+        components = self.gr.strongly_connected_components()
+        self.assertEqual(sorted(map(sorted, components)), [[0], [1, 2, 3], [4]])
+        # Reverse topological order
+        self.assertEqual(components[0], {4})
+        self.assertEqual(components[-1], {0})
+
+    def test_is_cyclic(self):
+        self.assertTrue(self.gr.is_cyclic())
+        self.gr.remove_edge(3, 1)
+        self.assertFalse(self.gr.is_cyclic())
+        self.assertIsNone(self.gr.find_cycle())
+
+    def test_find_cycle(self):
+        cycle = self.gr.find_cycle()
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assertEqual(sorted(cycle[:-1]), [1, 2, 3])
+        for src, tgt in zip(cycle, cycle[1:]):
+            self.assertIn(tgt, self.gr.get_node_by_id(src).get_children())
+
+    def test_self_loop(self):
+        self.assertTrue(open_digraph.identity(1).is_cyclic())
+        self.assertEqual(open_digraph.identity(1).find_cycle(), [0, 0])
+
+    def test_long_chain(self):
+        gr = open_digraph.empty()
+        previous = gr.add_node()
+        for _ in range(5000):
+            previous = gr.add_node(parents={previous:1})
+        self.assertFalse(gr.is_cyclic())
+        gr.add_edge(previous, 0)
+        self.assertEqual(len(gr.find_cycle()), 5002)
+
+
 if __name__ == '__main__': 
     unittest.main() 